@@ -1,13 +1,59 @@
 # api_scoreplage.py
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.responses import PlainTextResponse
-import json, math, urllib.request
+import json, math, os, threading, time, urllib.request
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import profiling
+from climatology import Climatology, month_of, spot_key, utc_hour
+from profiling import stage
 
-<<<<<<< HEAD
 app = FastAPI(title="Surf Score API testb(plain text)")
-=======
-app = FastAPI(title="Surf Score API testa (plain text)")
->>>>>>> demo_conflit_A
+
+# ---------- Limites par route ----------
+# Seau à jetons par client (clé API "X-API-Key" connue sinon IP) :
+#   rate = jetons/seconde, burst = taille du seau
+#   hit_cost / miss_cost = jetons consommés si la prévision est en cache / doit être téléchargée
+# Requêtes simultanées qui appellent Open-Meteo (cache miss uniquement) :
+#   max_concurrent, puis file d'attente de max_queue requêtes pendant queue_timeout secondes
+# Au-delà : 429 (client trop rapide) ou 503 (serveur saturé) avec Retry-After
+ROUTE_LIMITS = {
+    "/score": {
+        "rate": 1.0, "burst": 20, "hit_cost": 1, "miss_cost": 5,
+        "max_concurrent": 4, "max_queue": 8, "queue_timeout": 0.5,
+    },
+    "/health": None,  # jamais limitée
+}
+
+# Durée de vie d'une prévision en cache (Open-Meteo publie des données horaires)
+FORECAST_CACHE_TTL_S = 600
+FORECAST_CACHE_SIZE = 1024
+MAX_TRACKED_CLIENTS = 10000
+# Clés API reconnues (variable d'environnement SURF_API_KEYS, séparées par des virgules)
+API_KEYS = frozenset(k.strip() for k in os.environ.get("SURF_API_KEYS", "").split(",") if k.strip())
+
+# Historique des notes par spot et par mois (percentile affiché avec la note)
+CLIMATOLOGY_PATH = os.environ.get("SURF_CLIMATOLOGY_PATH", "climatology.json")
+climatology = Climatology(CLIMATOLOGY_PATH)
+
+# Profil de notation par défaut de /score (mêmes valeurs que surf_score.py) :
+# le seul dont les notes sont ajoutées à l'historique
+DEFAULT_PROFILE = dict(
+    spot_orientation_deg=300.0, tide_pref="mid",
+    ideal_height_min=0.8, ideal_height_max=2.2, ideal_period_min=8.0, ideal_period_max=14.0,
+    w_range=0.60, w_orient=0.25, w_tide=0.15,
+    tide_low_max=0.8, tide_high_min=0.8, tide_high_max=1.8, tide_full_span=1.6,
+)
+
+@app.on_event("startup")
+def start_climatology_autosave():
+    # écriture périodique dans un thread à part, jamais pendant une requête
+    climatology.start_autosave()
+
+@app.on_event("shutdown")
+def save_climatology():
+    climatology.save()
 
 # ---------- Utils ----------
 def scale(value, in_min, in_max, out_min=0.0, out_max=1.0):
@@ -52,7 +98,7 @@ def tide_band_from_height(h, low_max, high_min, high_max):
         return "high" if h >= (high_min + high_max)/2 else "mid"
     return "high" if h > high_max else "mid"
 
-def fetch_openmeteo_first_hour(lat, lon, tz="Europe/Paris"):
+def fetch_openmeteo_hours(lat, lon, tz="Europe/Paris"):
     url = (
         "https://marine-api.open-meteo.com/v1/marine"
         f"?latitude={lat}&longitude={lon}"
@@ -60,12 +106,20 @@ def fetch_openmeteo_first_hour(lat, lon, tz="Europe/Paris"):
         "sea_level_height_msl,ocean_current_velocity,ocean_current_direction"
         f"&timezone={tz}&forecast_days=1"
     )
-    with urllib.request.urlopen(url) as resp:
-        data = json.loads(resp.read().decode("utf-8"))
-    i = 0
+    with stage("fetch"):
+        with urllib.request.urlopen(url) as resp:
+            raw = resp.read()
+    with stage("decode"):
+        data = json.loads(raw.decode("utf-8"))
+        return hours_from_payload(data)
+
+def hours_from_payload(data):
+    """Toutes les heures de la prévision, dans l'ordre (la 1re = conditions actuelles)."""
     h = data["hourly"]
-    return {
+    offset = data.get("utc_offset_seconds", 0)
+    return [{
         "time": h["time"][i],
+        "time_utc": utc_hour(h["time"][i], offset),
         "wave_height_m": h["wave_height"][i],
         "wave_period_s": h["wave_period"][i],
         "wave_direction_deg": h["wave_direction"][i],
@@ -73,11 +127,156 @@ def fetch_openmeteo_first_hour(lat, lon, tz="Europe/Paris"):
         "sea_level_msl_m": h["sea_level_height_msl"][i],
         "current_velocity_ms": h["ocean_current_velocity"][i],
         "current_direction_deg": h["ocean_current_direction"][i],
-    }
+    } for i in range(len(h["time"]))]
+
+def score_hour(h, p):
+    """Note /100 (None si données insuffisantes) et score d'orientation d'une heure, pour le profil p."""
+    height_score = scale(h["wave_height_m"], p["ideal_height_min"], p["ideal_height_max"])
+    period_score = scale(h["wave_period_s"], p["ideal_period_min"], p["ideal_period_max"])
+    range_score = mean([height_score, period_score])
+
+    orient_score = directional_affinity(p["spot_orientation_deg"], h["wave_direction_deg"])
+    tide_score = tide_score_from_height(p["tide_pref"], h["sea_level_msl_m"], p["tide_low_max"],
+                                        p["tide_high_min"], p["tide_high_max"], p["tide_full_span"])
+
+    parts, used = [], 0.0
+    for val, w in [(range_score, p["w_range"]), (orient_score, p["w_orient"]), (tide_score, p["w_tide"])]:
+        if val is not None:
+            parts.append(val * w); used += w
+    note = round((sum(parts) / used) * 100) if parts else None
+    return note, orient_score
+
+# ---------- Cache des prévisions ----------
+_forecast_cache = OrderedDict()  # (lat, lon, tz) -> (expiration, heures)
+_forecast_lock = threading.Lock()
+
+def forecast_cache_key(lat, lon, tz):
+    # ~100 m de précision : deux requêtes sur la même plage partagent la prévision
+    return (round(lat, 3), round(lon, 3), tz)
+
+def cached_forecast(key):
+    with _forecast_lock:
+        entry = _forecast_cache.get(key)
+        if entry is None: return None
+        if entry[0] < time.monotonic():
+            del _forecast_cache[key]
+            return None
+        _forecast_cache.move_to_end(key)
+        return entry[1]
+
+def store_forecast(key, hours):
+    with _forecast_lock:
+        _forecast_cache[key] = (time.monotonic() + FORECAST_CACHE_TTL_S, hours)
+        _forecast_cache.move_to_end(key)
+        while len(_forecast_cache) > FORECAST_CACHE_SIZE:
+            _forecast_cache.popitem(last=False)
+
+# ---------- Limitation de débit / admission ----------
+class Rejected(Exception):
+    def __init__(self, status, retry_after, message):
+        super().__init__(message)
+        self.status, self.retry_after, self.message = status, retry_after, message
+
+@app.exception_handler(Rejected)
+def rejected_handler(request: Request, exc: Rejected):
+    return PlainTextResponse(exc.message, status_code=exc.status,
+                             headers={"Retry-After": str(exc.retry_after)})
+
+_buckets = OrderedDict()  # (route, client) -> [jetons, dernière mise à jour]
+_buckets_lock = threading.Lock()
+
+def client_key(request):
+    """Clé API si elle est dans API_KEYS, sinon IP (une clé inconnue ne donne pas un seau neuf)."""
+    key = request.headers.get("x-api-key")
+    if key and key in API_KEYS:
+        return f"key:{key}"
+    return request.client.host if request.client else "inconnu"
+
+def take_tokens(route, client, cost, limits):
+    """Seau à jetons : consomme cost jetons ou lève Rejected(429)."""
+    rate, burst = limits["rate"], limits["burst"]
+    now = time.monotonic()
+    with _buckets_lock:
+        bucket = _buckets.get((route, client))
+        if bucket is None:
+            bucket = _buckets[(route, client)] = [float(burst), now]
+            if len(_buckets) > MAX_TRACKED_CLIENTS:
+                _buckets.popitem(last=False)
+        else:
+            _buckets.move_to_end((route, client))
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        if bucket[0] >= cost:
+            bucket[0] -= cost
+            return
+        missing = cost - bucket[0]
+    raise Rejected(429, math.ceil(missing / rate), "Trop de requêtes, ralentissez")
+
+class AdmissionSlot:
+    """Limite globale de requêtes simultanées par route, avec file d'attente courte et bornée."""
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.running = 0
+        self.waiting = 0
+
+    @contextmanager
+    def hold(self, limits):
+        max_concurrent = limits["max_concurrent"]
+        with self.cond:
+            if self.running >= max_concurrent:
+                if self.waiting >= limits["max_queue"]:
+                    raise Rejected(503, 1, "Serveur saturé, réessayez dans un instant")
+                self.waiting += 1
+                try:
+                    with stage("queue"):
+                        ok = self.cond.wait_for(lambda: self.running < max_concurrent, limits["queue_timeout"])
+                finally:
+                    self.waiting -= 1
+                if not ok:
+                    raise Rejected(503, 1, "Serveur saturé, réessayez dans un instant")
+            self.running += 1
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.running -= 1
+                self.cond.notify()
+
+_admission = {route: AdmissionSlot() for route in ROUTE_LIMITS}
+
+def admit_hours(route, request, lat, lon, tz):
+    """
+    Contrôle d'admission puis récupération des heures de prévision.
+    Un cache hit coûte hit_cost jetons et ne prend pas de place dans la limite
+    de requêtes simultanées ; un cache miss coûte miss_cost et attend une place.
+    """
+    limits = ROUTE_LIMITS.get(route)
+    key = forecast_cache_key(lat, lon, tz)
+    hours = cached_forecast(key)
+    if not limits:
+        if hours is None:
+            hours = fetch_openmeteo_hours(lat, lon, tz=tz)
+            store_forecast(key, hours)
+        return hours
+
+    client = client_key(request)
+    if hours is not None:
+        take_tokens(route, client, limits["hit_cost"], limits)
+        return hours
+
+    take_tokens(route, client, limits["miss_cost"], limits)
+    with _admission[route].hold(limits):
+        # Une autre requête a pu remplir le cache pendant l'attente
+        hours = cached_forecast(key)
+        if hours is None:
+            hours = fetch_openmeteo_hours(lat, lon, tz=tz)
+            store_forecast(key, hours)
+    return hours
 
 # ---------- Endpoint: texte brut ----------
 @app.get("/score", response_class=PlainTextResponse)
 def score(
+    request: Request,
     # Biarritz par défaut
     lat: float = Query(43.483),
     lon: float = Query(-1.558),
@@ -99,49 +298,109 @@ def score(
     tide_full_span: float = Query(1.6),
     timezone: str = Query("Europe/Paris"),
 ):
-    first = fetch_openmeteo_first_hour(lat, lon, tz=timezone)
+    # paramètres et droits admin évalués seulement si la requête est profilée
+    prof = profiling.start("/score", lambda: str(request.query_params),
+                           request.headers.get("x-profile"), lambda: is_admin(request))
+    with prof:
+        hours = admit_hours("/score", request, lat, lon, timezone)
+        first = hours[0]
 
-    # sous-scores
-    height_score = scale(first["wave_height_m"], ideal_height_min, ideal_height_max)
-    period_score = scale(first["wave_period_s"], ideal_period_min, ideal_period_max)
-    range_score = mean([height_score, period_score])
+        with stage("score"):
+            profile = dict(
+                spot_orientation_deg=spot_orientation_deg, tide_pref=tide_pref,
+                ideal_height_min=ideal_height_min, ideal_height_max=ideal_height_max,
+                ideal_period_min=ideal_period_min, ideal_period_max=ideal_period_max,
+                w_range=w_range, w_orient=w_orient, w_tide=w_tide,
+                tide_low_max=tide_low_max, tide_high_min=tide_high_min,
+                tide_high_max=tide_high_max, tide_full_span=tide_full_span,
+            )
+            note, orient_score = score_hour(first, profile)
 
-    orient_score = directional_affinity(spot_orientation_deg, first["wave_direction_deg"])
-    tide_score = tide_score_from_height(tide_pref, first["sea_level_msl_m"], tide_low_max, tide_high_min, tide_high_max, tide_full_span)
+            # percentile de la note dans l'historique du spot (même mois), puis ajout
+            # de chaque heure de la prévision (une heure déjà vue n'est pas recomptée).
+            # Seul le profil par défaut alimente l'historique : des paramètres libres
+            # ne doivent pas créer de nouveaux "spots" dans la climatologie.
+            if profile == DEFAULT_PROFILE:
+                spot = spot_key(lat, lon, *DEFAULT_PROFILE.values())
+                # heures en UTC : le paramètre timezone ne change ni le dédoublonnage ni le mois
+                month = month_of(first["time_utc"])
+                percentile_txt = climatology.describe(spot, month, note)
+                for h in hours:
+                    climatology.record(spot, h["time_utc"], score_hour(h, profile)[0])
+            else:
+                percentile_txt = "disponible seulement avec le profil de notation par défaut"
 
-    parts, used = [], 0.0
-    for val, w in [(range_score, w_range), (orient_score, w_orient), (tide_score, w_tide)]:
-        if val is not None:
-            parts.append(val * w); used += w
-    note = round((sum(parts) / used) * 100) if parts else None
+            # labels
+            orient_txt = orient_label(orient_score)
+            tide_band  = tide_band_from_height(first["sea_level_msl_m"], tide_low_max, tide_high_min, tide_high_max)
 
-    # labels
-    orient_txt = orient_label(orient_score)
-    tide_band  = tide_band_from_height(first["sea_level_msl_m"], tide_low_max, tide_high_min, tide_high_max)
+        with stage("render"):
+            # texte EXACT au format demandé
+            note_line = (
+                f"NOTE = {note}/100  (poids: plage={w_range}, orientation={w_orient}, marée={w_tide})"
+                if note is not None else
+                "NOTE = N/A (données insuffisantes)"
+            )
 
-    # texte EXACT au format demandé
-    note_line = (
-        f"NOTE = {note}/100  (poids: plage={w_range}, orientation={w_orient}, marée={w_tide})"
-        if note is not None else
-        "NOTE = N/A (données insuffisantes)"
-    )
-
-    text = (
-        "=== Conditions idéales (profil spot) ===\n"
-        f"• Plage (houle) idéale : hauteur {ideal_height_min}–{ideal_height_max} m, période {ideal_period_min}–{ideal_period_max} s\n"
-        f"• Orientation idéale   : spot ~{int(spot_orientation_deg)}° (NW)\n"
-        f"• Marée idéale         : {tide_pref}\n\n"
-        "=== Conditions actuelles (1re heure dispo) ===\n"
-        f"• Heure Europe/Paris   : {first['time']}\n"
-        f"• Orientation houle    : {first['wave_direction_deg']}°  → {orient_txt}\n"
-        f"• Marée (proxy hauteur): {first['sea_level_msl_m']} m  → bande '{tide_band}' (préférence: {tide_pref})\n"
-        f"• Houle mesurée        : {first['wave_height_m']} m @ {first['wave_period_s']} s\n\n"
-        "=== Note donnée ===\n"
-        f"{note_line}"
-    )
+            text = (
+                "=== Conditions idéales (profil spot) ===\n"
+                f"• Plage (houle) idéale : hauteur {ideal_height_min}–{ideal_height_max} m, période {ideal_period_min}–{ideal_period_max} s\n"
+                f"• Orientation idéale   : spot ~{int(spot_orientation_deg)}° (NW)\n"
+                f"• Marée idéale         : {tide_pref}\n\n"
+                "=== Conditions actuelles (1re heure dispo) ===\n"
+                f"• Heure Europe/Paris   : {first['time']}\n"
+                f"• Orientation houle    : {first['wave_direction_deg']}°  → {orient_txt}\n"
+                f"• Marée (proxy hauteur): {first['sea_level_msl_m']} m  → bande '{tide_band}' (préférence: {tide_pref})\n"
+                f"• Houle mesurée        : {first['wave_height_m']} m @ {first['wave_period_s']} s\n\n"
+                "=== Note donnée ===\n"
+                f"{note_line}\n"
+                f"Percentile : {percentile_txt}"
+            )
 
-    return text
+        return text
 
 @app.get("/health", response_class=PlainTextResponse)
 def health():
     return "ok"
+
+# ---------- Admin: profilage à la demande ----------
+# Jeton admin via la variable d'environnement SURF_ADMIN_TOKEN (routes admin désactivées sinon),
+# à envoyer dans l'en-tête "X-Admin-Token". Avec ce jeton, l'en-tête "X-Profile: 1"
+# force la capture cProfile d'une requête.
+ADMIN_TOKEN = os.environ.get("SURF_ADMIN_TOKEN")
+
+def is_admin(request):
+    return bool(ADMIN_TOKEN) and request.headers.get("x-admin-token") == ADMIN_TOKEN
+
+def require_admin(request):
+    if not is_admin(request):
+        raise HTTPException(status_code=403, detail="Jeton admin requis")
+
+@app.get("/admin/profiling")
+def profiling_status(request: Request):
+    require_admin(request)
+    return {"config": dict(profiling.CONFIG), "captures": len(profiling.captures()),
+            "buffer_size": profiling.BUFFER_SIZE}
+
+@app.post("/admin/profiling")
+def profiling_configure(
+    request: Request,
+    sample_rate: float = Query(None, ge=0.0, le=1.0, description="Fraction des requêtes profilées avec cProfile"),
+    route: list[str] = Query(None, description="Routes concernées (vide = toutes)"),
+    slow_ms: float = Query(None, gt=0, description="Seuil de capture des requêtes lentes (ms)"),
+    disable_slow: bool = Query(False, description="Désactive la capture des requêtes lentes"),
+):
+    require_admin(request)
+    return {"config": profiling.configure(sample_rate, route, slow_ms, disable_slow)}
+
+@app.get("/admin/slow-requests")
+def slow_requests(request: Request, limit: int = Query(20, ge=1, le=profiling.BUFFER_SIZE)):
+    """Dernières requêtes capturées (lentes ou échantillonnées), les plus récentes d'abord."""
+    require_admin(request)
+    return {"captures": profiling.captures()[::-1][:limit]}
+
+@app.delete("/admin/slow-requests")
+def slow_requests_clear(request: Request):
+    require_admin(request)
+    profiling.clear_captures()
+    return {"cleared": True}
@@ -4,11 +4,23 @@ Serveur Flask pour l'API de prévisions surf
 Projet pédagogique Python pour apprendre le développement web
 """
 
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, g, jsonify, request, send_from_directory
 from flask_cors import CORS
+from dotenv import load_dotenv
 import os
+import secrets
+import threading
+import time
 from datetime import datetime
 
+from services.authentification import (
+    GestionnaireJetons, ServiceSature, StockUtilisateurs, empreinte_factice,
+    hacher_mot_de_passe, jeton_requis, verifier_mot_de_passe
+)
+from services.diffusion import MAX_SPOTS_PAR_ABONNEMENT, Diffuseur, FluxSature
+from services.limitation import limiter
+from services.statiques import ActifsStatiques
+
 # Import des routes (on les créera progressivement)
 # from routes import authentification, spots, conditions, previsions
 
@@ -19,9 +31,60 @@ app = Flask(__name__, static_folder='../frontend')
 # Permet au frontend de communiquer avec l'API même s'ils sont sur des ports différents
 CORS(app)
 
+# Variables d'environnement (fichier .env à la racine du projet ou du dossier backend)
+load_dotenv()
+
+# Mode debug (rechargement auto + messages d'erreur détaillés), seulement si MYSURF_DEBUG=1
+MODE_DEBUG = os.environ.get('MYSURF_DEBUG') == '1'
+
 # Configuration de l'application
-app.config['SECRET_KEY'] = 'votre-cle-secrete-a-changer'  # A mettre dans .env plus tard pour la sécurité
+# La clé secrète signe les jetons de connexion : elle doit venir de l'environnement (MYSURF_SECRET_KEY)
+# En debug uniquement, une clé aléatoire est générée (les jetons ne survivent pas à un redémarrage)
+app.config['SECRET_KEY'] = os.environ.get('MYSURF_SECRET_KEY')
+if not app.config['SECRET_KEY']:
+    if not MODE_DEBUG:
+        raise RuntimeError('MYSURF_SECRET_KEY manquante : définissez-la dans .env ou dans l\'environnement')
+    print('ATTENTION: MYSURF_SECRET_KEY absente, clé temporaire générée (mode debug)')
+    app.config['SECRET_KEY'] = secrets.token_hex(32)
 app.config['JSON_AS_ASCII'] = False  # Permet l'affichage correct des accents français dans les réponses JSON
+app.config['DUREE_JETON'] = 3600  # Durée de validité d'un jeton de connexion (secondes)
+
+# Dossier des données locales (utilisateurs, etc.)
+DOSSIER_DONNEES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'donnees')
+# Dossier du frontend (HTML/CSS/JS)
+DOSSIER_FRONTEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend')
+
+# Fichiers statiques préparés une fois au démarrage (empreinte, gzip/brotli, en mémoire)
+# Après une modification du frontend, il faut relancer le serveur
+actifs_statiques = ActifsStatiques(DOSSIER_FRONTEND)
+
+# Utilisateurs enregistrés et gestion des jetons d'authentification
+utilisateurs = StockUtilisateurs(os.path.join(DOSSIER_DONNEES, 'utilisateurs.json'))
+jetons = GestionnaireJetons(app.config['SECRET_KEY'], duree_validite=app.config['DUREE_JETON'])
+
+# Diffusion temps réel des mises à jour (un seul diffuseur partagé par toutes les connexions)
+app.config['INTERVALLE_PREVISIONS'] = 600  # Vérification des nouvelles prévisions toutes les 10 minutes
+# Chaque flux ouvert occupe un thread du serveur : on plafonne le nombre de flux simultanés
+# (à augmenter seulement avec des workers asynchrones, par exemple gunicorn + gevent)
+app.config['MAX_FLUX_SIMULTANES'] = int(os.environ.get('MYSURF_MAX_FLUX', 500))
+diffuseur = Diffuseur(max_abonnes=app.config['MAX_FLUX_SIMULTANES'])
+
+# Clés API reconnues (séparées par des virgules) ; une clé absente de la liste est ignorée
+# et le client est identifié par son adresse IP
+app.config['CLES_API'] = frozenset(
+    cle.strip() for cle in os.environ.get('MYSURF_CLES_API', '').split(',') if cle.strip()
+)
+
+# Limites par route (voir services/limitation.py), par client = clé API connue (X-API-Key) ou IP
+#   debit/rafale/cout : seau à jetons par client -> 429 quand il est vide
+#   simultanees/file/attente_max : requêtes simultanées sur la route -> 503 au-delà
+# Une route absente de ce dictionnaire n'est pas limitée
+app.config['LIMITES_ROUTES'] = {
+    'conditions': {'debit': 5, 'rafale': 20},
+    'previsions': {'debit': 5, 'rafale': 20},
+    'connexion': {'debit': 0.2, 'rafale': 5, 'simultanees': 8, 'file': 16, 'attente_max': 1.0},
+    'inscription': {'debit': 0.05, 'rafale': 3, 'simultanees': 4, 'file': 8, 'attente_max': 1.0},
+}
 
 # ============================================================================
 # ROUTES STATIQUES - Servir les fichiers HTML/CSS/JS du frontend
@@ -31,18 +94,26 @@ app.config['JSON_AS_ASCII'] = False  # Permet l'affichage correct des accents fr
 def page_accueil():
     """
     Route principale qui sert la page d'accueil
-    Retourne le fichier index.html du dossier frontend
+    Retourne le fichier index.html du dossier frontend, réécrit pour
+    pointer vers app.<empreinte>.js et style.<empreinte>.css
     """
-    return send_from_directory('../frontend', 'index.html')
+    return actifs_statiques.reponse('index.html', request)
 
 @app.route('/<path:chemin>')
 def fichiers_statiques(chemin):
     """
     Route pour servir tous les fichiers statiques (CSS, JS, images)
     Le paramètre chemin capture n'importe quel chemin demandé
-    Exemple: /style5.css, /app.js, etc.
+    Exemple: /style.3f2a9c1b7d.css, /app.js, etc.
+
+    Les fichiers viennent de la mémoire (voir services/statiques.py):
+    version br/gzip selon le navigateur, cache d'un an pour les noms avec empreinte
     """
-    return send_from_directory('../frontend', chemin)
+    reponse = actifs_statiques.reponse(chemin, request)
+    if reponse is not None:
+        return reponse
+    # Fichier ajouté après le démarrage (ou inexistant -> 404)
+    return send_from_directory(DOSSIER_FRONTEND, chemin)
 
 # ============================================================================
 # ROUTES API - Points d'entrée de l'API REST
@@ -65,6 +136,57 @@ def verification_sante():
 # SPOTS - Gestion des spots de surf
 # ----------------------------------------------------------------------------
 
+# Liste de 5 spots de la côte basque (partagée par toutes les routes)
+# Plus tard, on la lira depuis un fichier donnees/spots.json
+# Chaque spot contient: id, nom, localisation, coordonnées GPS, orientation et type
+SPOTS = [
+    {
+        'id': 1,
+        'nom': 'Hossegor - Plage Nord',
+        'localisation': 'Hossegor, Landes',
+        'latitude': 43.6667,  # Coordonnées GPS
+        'longitude': -1.4,
+        'orientation': 270,  # Direction en degrés (270 = Ouest)
+        'type': 'beach_break'  # Type de vague (beach break, reef break, point break)
+    },
+    {
+        'id': 2,
+        'nom': 'Hossegor - La Gravière',
+        'localisation': 'Hossegor, Landes',
+        'latitude': 43.6617,
+        'longitude': -1.4033,
+        'orientation': 270,
+        'type': 'beach_break'
+    },
+    {
+        'id': 3,
+        'nom': 'Biarritz - Grande Plage',
+        'localisation': 'Biarritz, Pyrénées-Atlantiques',
+        'latitude': 43.4832,
+        'longitude': -1.5586,
+        'orientation': 290,  # Ouest-Nord-Ouest
+        'type': 'beach_break'
+    },
+    {
+        'id': 4,
+        'nom': 'Biarritz - Côte des Basques',
+        'localisation': 'Biarritz, Pyrénées-Atlantiques',
+        'latitude': 43.4762,
+        'longitude': -1.5594,
+        'orientation': 280,  # Ouest
+        'type': 'beach_break'
+    },
+    {
+        'id': 5,
+        'nom': 'Guéthary - Parlementia',
+        'localisation': 'Guéthary, Pyrénées-Atlantiques',
+        'latitude': 43.4247,
+        'longitude': -1.6061,
+        'orientation': 315,  # Nord-Ouest
+        'type': 'reef_break'
+    }
+]
+
 @app.route('/api/spots', methods=['GET'])
 def obtenir_spots():
     """
@@ -77,64 +199,14 @@ def obtenir_spots():
     Retourne:
         JSON avec la liste des spots et leur nombre total
     """
-    # Liste de 5 spots de la côte basque
-    # Chaque spot contient: id, nom, localisation, coordonnées GPS, orientation et type
-    spots = [
-        {
-            'id': 1,
-            'nom': 'Hossegor - Plage Nord',
-            'localisation': 'Hossegor, Landes',
-            'latitude': 43.6667,  # Coordonnées GPS
-            'longitude': -1.4,
-            'orientation': 270,  # Direction en degrés (270 = Ouest)
-            'type': 'beach_break'  # Type de vague (beach break, reef break, point break)
-        },
-        {
-            'id': 2,
-            'nom': 'Hossegor - La Gravière',
-            'localisation': 'Hossegor, Landes',
-            'latitude': 43.6617,
-            'longitude': -1.4033,
-            'orientation': 270,
-            'type': 'beach_break'
-        },
-        {
-            'id': 3,
-            'nom': 'Biarritz - Grande Plage',
-            'localisation': 'Biarritz, Pyrénées-Atlantiques',
-            'latitude': 43.4832,
-            'longitude': -1.5586,
-            'orientation': 290,  # Ouest-Nord-Ouest
-            'type': 'beach_break'
-        },
-        {
-            'id': 4,
-            'nom': 'Biarritz - Côte des Basques',
-            'localisation': 'Biarritz, Pyrénées-Atlantiques',
-            'latitude': 43.4762,
-            'longitude': -1.5594,
-            'orientation': 280,  # Ouest
-            'type': 'beach_break'
-        },
-        {
-            'id': 5,
-            'nom': 'Guéthary - Parlementia',
-            'localisation': 'Guéthary, Pyrénées-Atlantiques',
-            'latitude': 43.4247,
-            'longitude': -1.6061,
-            'orientation': 315,  # Nord-Ouest
-            'type': 'reef_break'
-        }
-    ]
-
     # Retourne un objet JSON standardisé
     # succes: indique si la requête a réussi
     # donnees: contient les données demandées
     # nombre: nombre d'éléments (utile pour la pagination)
     return jsonify({
         'succes': True,
-        'donnees': spots,
-        'nombre': len(spots)
+        'donnees': SPOTS,
+        'nombre': len(SPOTS)
     })
 
 @app.route('/api/spots/<int:id_spot>', methods=['GET'])
@@ -150,18 +222,8 @@ def obtenir_spot_par_id(id_spot):
     Retourne:
         JSON avec les informations détaillées du spot
     """
-    # Liste des spots (même liste que dans obtenir_spots)
-    # Plus tard, on la mettra dans un fichier séparé ou une base de données
-    spots = [
-        {'id': 1, 'nom': 'Hossegor - Plage Nord', 'localisation': 'Hossegor, Landes', 'latitude': 43.6667, 'longitude': -1.4, 'orientation': 270, 'type': 'beach_break'},
-        {'id': 2, 'nom': 'Hossegor - La Gravière', 'localisation': 'Hossegor, Landes', 'latitude': 43.6617, 'longitude': -1.4033, 'orientation': 270, 'type': 'beach_break'},
-        {'id': 3, 'nom': 'Biarritz - Grande Plage', 'localisation': 'Biarritz, Pyrénées-Atlantiques', 'latitude': 43.4832, 'longitude': -1.5586, 'orientation': 290, 'type': 'beach_break'},
-        {'id': 4, 'nom': 'Biarritz - Côte des Basques', 'localisation': 'Biarritz, Pyrénées-Atlantiques', 'latitude': 43.4762, 'longitude': -1.5594, 'orientation': 280, 'type': 'beach_break'},
-        {'id': 5, 'nom': 'Guéthary - Parlementia', 'localisation': 'Guéthary, Pyrénées-Atlantiques', 'latitude': 43.4247, 'longitude': -1.6061, 'orientation': 315, 'type': 'reef_break'}
-    ]
-
     # Chercher le spot avec l'ID demandé
-    spot = next((s for s in spots if s['id'] == id_spot), None)
+    spot = next((s for s in SPOTS if s['id'] == id_spot), None)
 
     if spot:
         return jsonify({
@@ -178,10 +240,10 @@ def obtenir_spot_par_id(id_spot):
 # CONDITIONS ACTUELLES - Récupération des conditions de surf en temps réel
 # ----------------------------------------------------------------------------
 
-@app.route('/api/conditions/<int:id_spot>', methods=['GET'])
-def obtenir_conditions(id_spot):
+def construire_conditions(id_spot):
     """
-    Récupère les conditions de surf actuelles pour un spot donné
+    Construit les conditions de surf actuelles pour un spot donné
+    Utilisé par la route /api/conditions et par le flux temps réel /api/flux
 
     Inclut:
         - Hauteur, période et direction des vagues
@@ -232,19 +294,28 @@ def obtenir_conditions(id_spot):
         'note': 4
     }
 
+    return conditions
+
+@app.route('/api/conditions/<int:id_spot>', methods=['GET'])
+@limiter('conditions')
+def obtenir_conditions(id_spot):
+    """
+    Récupère les conditions de surf actuelles pour un spot donné
+    Voir construire_conditions pour le détail des données
+    """
     return jsonify({
         'succes': True,
-        'donnees': conditions
+        'donnees': construire_conditions(id_spot)
     })
 
 # ----------------------------------------------------------------------------
 # PRÉVISIONS - Prédictions des conditions pour les 5 prochains jours
 # ----------------------------------------------------------------------------
 
-@app.route('/api/previsions/<int:id_spot>', methods=['GET'])
-def obtenir_previsions(id_spot):
+def construire_previsions(id_spot):
     """
-    Récupère les prévisions de surf pour J à J+4 (5 jours)
+    Construit les prévisions de surf pour J à J+4 (5 jours)
+    Utilisé par la route /api/previsions et par le flux temps réel /api/flux
 
     Pour chaque jour:
         - Score de qualité (nombre d'étoiles)
@@ -312,17 +383,134 @@ def obtenir_previsions(id_spot):
         }
     ]
 
+    return previsions
+
+@app.route('/api/previsions/<int:id_spot>', methods=['GET'])
+@limiter('previsions')
+def obtenir_previsions(id_spot):
+    """
+    Récupère les prévisions de surf pour J à J+4 (5 jours)
+    Voir construire_previsions pour le détail des données
+    """
+    previsions = construire_previsions(id_spot)
+
     return jsonify({
         'succes': True,
         'donnees': previsions,
         'nombre': len(previsions)
     })
 
+# ----------------------------------------------------------------------------
+# FLUX TEMPS RÉEL - Mises à jour poussées au navigateur (Server-Sent Events)
+# ----------------------------------------------------------------------------
+
+def publier_spot(id_spot):
+    """
+    Publie les conditions et prévisions d'un spot dans le diffuseur
+
+    La signature ignore l'horodatage : si les données n'ont pas changé,
+    le diffuseur n'envoie rien aux clients
+    """
+    conditions = construire_conditions(id_spot)
+    previsions = construire_previsions(id_spot)
+    signature = repr(({k: v for k, v in conditions.items() if k != 'horodatage'}, previsions))
+    return diffuseur.publier(id_spot, {
+        'id_spot': id_spot,
+        'conditions': conditions,
+        'previsions': previsions
+    }, signature=signature)
+
+def surveiller_previsions():
+    """
+    Boucle de fond: recalcule les données de chaque spot à intervalle régulier
+    Seules les nouvelles prévisions sont poussées aux clients abonnés
+    """
+    while True:
+        for spot in SPOTS:
+            try:
+                publier_spot(spot['id'])
+            except Exception as erreur:  # une erreur sur un spot ne doit pas arrêter la boucle
+                print(f"Erreur mise à jour spot {spot['id']}: {erreur}")
+        time.sleep(app.config['INTERVALLE_PREVISIONS'])
+
+_surveillance_demarree = False
+_verrou_surveillance = threading.Lock()
+
+def demarrer_surveillance():
+    """Démarre la boucle de fond au premier abonnement (une seule fois par processus)"""
+    global _surveillance_demarree
+    with _verrou_surveillance:
+        if not _surveillance_demarree:
+            threading.Thread(target=surveiller_previsions, daemon=True).start()
+            _surveillance_demarree = True
+
+@app.route('/api/flux', methods=['GET'])
+def flux_temps_reel():
+    """
+    Flux Server-Sent Events des mises à jour pour un ou plusieurs spots
+
+    Paramètre:
+        spots: liste d'IDs séparés par des virgules (ex: /api/flux?spots=1,3)
+
+    Le client reçoit tout de suite l'état courant de chaque spot, puis un
+    événement "mise_a_jour" uniquement quand une nouvelle prévision arrive.
+    Côté navigateur: new EventSource('/api/flux?spots=1')
+
+    Au-delà de MAX_FLUX_SIMULTANES flux ouverts, répond 503 (avec Retry-After)
+    """
+    ids_connus = {spot['id'] for spot in SPOTS}
+    try:
+        ids_spots = sorted({int(x) for x in request.args.get('spots', '').split(',') if x.strip()})
+    except ValueError:
+        ids_spots = []
+
+    if not ids_spots or len(ids_spots) > MAX_SPOTS_PAR_ABONNEMENT or not set(ids_spots) <= ids_connus:
+        return jsonify({
+            'succes': False,
+            'message': f'Paramètre spots invalide (1 à {MAX_SPOTS_PAR_ABONNEMENT} IDs de spots existants)'
+        }), 400
+
+    try:
+        flux = diffuseur.flux(ids_spots)
+    except FluxSature:
+        reponse = jsonify({
+            'succes': False,
+            'message': 'Trop de connexions temps réel ouvertes, réessayez plus tard'
+        })
+        reponse.headers['Retry-After'] = '30'
+        return reponse, 503
+
+    demarrer_surveillance()
+
+    # Pas de stream_with_context: le flux n'utilise pas la requête,
+    # inutile de garder son contexte en mémoire pendant toute la connexion
+    # Werkzeug appelle flux.close() à la fin de la réponse (déconnexion du client)
+    return Response(
+        flux,
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Désactive la mise en tampon de nginx
+        }
+    )
+
 # ----------------------------------------------------------------------------
 # AUTHENTIFICATION - Gestion des utilisateurs
 # ----------------------------------------------------------------------------
 
+def identifiants_valides(donnees):
+    """
+    Vérifie que le JSON reçu est un objet avec nom_utilisateur et mot_de_passe en texte non vide
+    (une liste ou un nombre ferait planter la recherche ou le hachage)
+    """
+    return (
+        isinstance(donnees, dict)
+        and isinstance(donnees.get('nom_utilisateur'), str) and donnees['nom_utilisateur'] != ''
+        and isinstance(donnees.get('mot_de_passe'), str) and donnees['mot_de_passe'] != ''
+    )
+
 @app.route('/api/connexion', methods=['POST'])
+@limiter('connexion')
 def connexion():
     """
     Connexion d'un utilisateur existant
@@ -332,39 +520,50 @@ def connexion():
         - mot_de_passe: mot de passe
 
     Retourne:
-        - Token d'authentification (JWT plus tard)
+        - Jeton d'authentification signé
         - Informations utilisateur
 
-    Note: Pour l'instant, version très simplifiée sans sécurité
-    Plus tard, on vérifiera le mot de passe hashé en base de données
-    et on générera un vrai token JWT
+    Le mot de passe est comparé à l'empreinte scrypt enregistrée
+    et le jeton retourné est signé avec SECRET_KEY (valable DUREE_JETON secondes)
     """
     # Récupère les données JSON envoyées dans la requête
     donnees = request.get_json()
 
     # Validation: vérifie que les champs requis sont présents
-    if not donnees or 'nom_utilisateur' not in donnees or 'mot_de_passe' not in donnees:
+    if not identifiants_valides(donnees):
         return jsonify({
             'succes': False,
             'message': 'Nom d\'utilisateur et mot de passe requis'
         }), 400  # Code HTTP 400 = Bad Request
 
-    # TODO: Vérifier le nom_utilisateur et mot_de_passe en base de données
-    # TODO: Comparer le mot_de_passe hashé (avec bcrypt par exemple)
+    # Vérification du mot de passe hashé (dans le pool de processus, voir services/authentification.py)
+    # Si l'utilisateur n'existe pas, on vérifie quand même contre une empreinte factice
+    # pour que le temps de réponse soit le même
+    utilisateur = utilisateurs.trouver(donnees['nom_utilisateur'])
+    try:
+        empreinte = utilisateur['mot_de_passe'] if utilisateur else empreinte_factice()
+        mot_de_passe_valide = verifier_mot_de_passe(donnees['mot_de_passe'], empreinte)
+    except ServiceSature:
+        return service_sature()
+
+    if not utilisateur or not mot_de_passe_valide:
+        return jsonify({
+            'succes': False,
+            'message': 'Nom d\'utilisateur ou mot de passe incorrect'
+        }), 401  # Code HTTP 401 = Unauthorized
 
-    # Pour l'instant, on accepte n'importe quelle combinaison
-    # C'est juste pour tester le fonctionnement de l'API
     return jsonify({
         'succes': True,
         'message': 'Connexion réussie',
         'donnees': {
-            'id_utilisateur': 1,
-            'nom_utilisateur': donnees['nom_utilisateur'],
-            'jeton': 'faux-jeton-jwt'  # A remplacer par un vrai JWT plus tard
+            'id_utilisateur': utilisateur['id_utilisateur'],
+            'nom_utilisateur': utilisateur['nom_utilisateur'],
+            'jeton': jetons.generer(utilisateur)
         }
     })
 
 @app.route('/api/inscription', methods=['POST'])
+@limiter('inscription')
 def inscription():
     """
     Inscription d'un nouvel utilisateur
@@ -378,35 +577,79 @@ def inscription():
         - Confirmation de l'inscription
         - ID du nouvel utilisateur
 
-    TODO:
-        - Vérifier que le nom_utilisateur n'existe pas déjà
-        - Hasher le mot de passe avant de le sauvegarder
-        - Sauvegarder dans un fichier JSON ou base de données
+    Le mot de passe est hashé (scrypt) avant d'être sauvegardé
+    dans donnees/utilisateurs.json
     """
     # Récupère les données envoyées
     donnees = request.get_json()
 
     # Validation des données
-    if not donnees or 'nom_utilisateur' not in donnees or 'mot_de_passe' not in donnees:
+    if not identifiants_valides(donnees) or not isinstance(donnees.get('email'), (str, type(None))):
         return jsonify({
             'succes': False,
             'message': 'Données incomplètes'
         }), 400
 
-    # TODO: Vérifier que le nom_utilisateur est disponible
-    # TODO: Hasher le mot_de_passe avec bcrypt
-    # TODO: Sauvegarder le nouvel utilisateur
+    # Hachage du mot de passe (dans le pool de processus)
+    try:
+        empreinte = hacher_mot_de_passe(donnees['mot_de_passe'])
+    except ServiceSature:
+        return service_sature()
+
+    # Sauvegarde du nouvel utilisateur (None si le nom est déjà pris)
+    utilisateur = utilisateurs.creer(donnees['nom_utilisateur'], empreinte, donnees.get('email'))
+    if utilisateur is None:
+        return jsonify({
+            'succes': False,
+            'message': 'Nom d\'utilisateur déjà utilisé'
+        }), 409  # Code HTTP 409 = Conflict
 
-    # Pour l'instant, on confirme juste l'inscription
     return jsonify({
         'succes': True,
         'message': 'Inscription réussie',
         'donnees': {
-            'id_utilisateur': 1,
-            'nom_utilisateur': donnees['nom_utilisateur']
+            'id_utilisateur': utilisateur['id_utilisateur'],
+            'nom_utilisateur': utilisateur['nom_utilisateur']
+        }
+    }), 201  # Code HTTP 201 = Created
+
+@app.route('/api/profil', methods=['GET'])
+@jeton_requis(jetons)
+def obtenir_profil():
+    """
+    Informations de l'utilisateur connecté
+
+    Nécessite l'en-tête: Authorization: Bearer <jeton>
+    Le jeton est vérifié une seule fois puis gardé en cache (voir GestionnaireJetons)
+    """
+    utilisateur = utilisateurs.trouver(g.utilisateur['nom_utilisateur'])
+    if utilisateur is None:
+        return jsonify({
+            'succes': False,
+            'message': 'Utilisateur non trouvé'
+        }), 404
+
+    return jsonify({
+        'succes': True,
+        'donnees': {
+            'id_utilisateur': utilisateur['id_utilisateur'],
+            'nom_utilisateur': utilisateur['nom_utilisateur'],
+            'email': utilisateur['email']
         }
     })
 
+def service_sature():
+    """
+    Réponse quand trop de hachages de mots de passe sont déjà en cours
+    Le client peut réessayer après quelques secondes
+    """
+    reponse = jsonify({
+        'succes': False,
+        'message': 'Service momentanément surchargé, réessayez dans quelques secondes'
+    })
+    reponse.headers['Retry-After'] = '2'
+    return reponse, 503  # Code HTTP 503 = Service Unavailable
+
 # ============================================================================
 # GESTION DES ERREURS - Handlers pour les erreurs HTTP courantes
 # ============================================================================
@@ -451,16 +694,20 @@ if __name__ == '__main__':
     print("  GET  /api/spots/<id>")
     print("  GET  /api/conditions/<id_spot>")
     print("  GET  /api/previsions/<id_spot>")
+    print("  GET  /api/flux?spots=<id>,<id>  (Server-Sent Events)")
     print("  POST /api/connexion")
     print("  POST /api/inscription")
+    print("  GET  /api/profil")
     print("\nAppuyez sur Ctrl+C pour arrêter\n")
 
     # Lancement du serveur Flask
     # host='0.0.0.0' : accessible depuis n'importe quelle interface réseau
     # port=5000 : port d'écoute du serveur
-    # debug=True : active le mode debug (rechargement auto + messages d'erreur détaillés)
+    # debug : voir MODE_DEBUG (MYSURF_DEBUG=1)
+    # threaded=True : un thread par requête (nécessaire pour les connexions /api/flux qui restent ouvertes)
     app.run(
         host='0.0.0.0',
         port=5000,
-        debug=True
+        debug=MODE_DEBUG,
+        threaded=True
     )
\ No newline at end of file
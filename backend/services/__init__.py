@@ -0,0 +1,4 @@
+"""
+MySurf API - Services
+Logique métier utilisée par les routes de backend/app.py
+"""
@@ -0,0 +1,259 @@
+"""
+MySurf API - Service d'authentification
+Stockage des utilisateurs, hachage des mots de passe et jetons signés
+
+Le hachage d'un mot de passe (scrypt) est volontairement lent : il coûte
+plusieurs dizaines de millisecondes de CPU. Pour qu'une rafale de connexions
+ne bloque pas les autres routes, il est exécuté dans un pool de processus
+de taille fixe, avec une file d'attente bornée.
+
+Les jetons sont signés avec la clé secrète de l'application (itsdangerous,
+déjà installé avec Flask). Un cache LRU garde les jetons déjà vérifiés pour
+ne pas recalculer la signature à chaque appel authentifié.
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from functools import wraps
+
+from flask import g, jsonify, request
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+# ------------------ Configuration du hachage ------------------
+# Paramètres scrypt (n=2^14, r=8 : ~16 Mo de mémoire et ~50 ms par hachage)
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+LONGUEUR_SEL = 16
+LONGUEUR_EMPREINTE = 32
+
+# Nombre de processus dédiés au hachage (laisse au moins un coeur aux requêtes)
+TAILLE_POOL_HACHAGE = max(1, (os.cpu_count() or 2) - 1)
+# Nombre maximum de hachages en cours + en attente avant de refuser (503)
+LIMITE_FILE_HACHAGE = TAILLE_POOL_HACHAGE * 4
+# Temps maximum d'attente d'un hachage avant d'abandonner (secondes)
+DELAI_HACHAGE = 5.0
+
+
+class ServiceSature(Exception):
+    """Levée quand la file de hachage est pleine ou trop lente : la route répond 503"""
+
+
+# ------------------ Hachage (exécuté dans les processus du pool) ------------------
+def _calculer_scrypt(mot_de_passe, sel, n, r, p):
+    return hashlib.scrypt(
+        mot_de_passe.encode('utf-8'), salt=sel, n=n, r=r, p=p,
+        maxmem=128 * n * r * 2, dklen=LONGUEUR_EMPREINTE
+    )
+
+
+def _hacher(mot_de_passe):
+    """Retourne l'empreinte au format 'scrypt$n$r$p$sel$hash' (hexadécimal)"""
+    sel = secrets.token_bytes(LONGUEUR_SEL)
+    empreinte = _calculer_scrypt(mot_de_passe, sel, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${sel.hex()}${empreinte.hex()}"
+
+
+def _verifier(mot_de_passe, empreinte_stockee):
+    """Recalcule l'empreinte avec les paramètres stockés et compare en temps constant"""
+    # Une empreinte stockée abîmée (fichier modifié à la main, tronqué...) = mot de passe refusé,
+    # pas une erreur 500 : tout le décodage et le calcul sont dans le try
+    try:
+        algo, n, r, p, sel_hex, hash_hex = empreinte_stockee.split('$')
+        if algo != 'scrypt':
+            return False
+        sel, attendue = bytes.fromhex(sel_hex), bytes.fromhex(hash_hex)
+        empreinte = _calculer_scrypt(mot_de_passe, sel, int(n), int(r), int(p))
+    except (AttributeError, ValueError, OverflowError):
+        return False
+    return hmac.compare_digest(empreinte, attendue)
+
+
+# ------------------ Pool de processus borné ------------------
+_pool = None
+_verrou_pool = threading.Lock()
+_places_file = threading.BoundedSemaphore(LIMITE_FILE_HACHAGE)
+
+
+def _obtenir_pool():
+    """Crée le pool au premier besoin (et pas à l'import, pour le rechargement Flask)"""
+    global _pool
+    with _verrou_pool:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=TAILLE_POOL_HACHAGE)
+        return _pool
+
+
+def _executer_dans_pool(fonction, *args):
+    # Refus immédiat si la file est pleine : mieux vaut un 503 rapide
+    # qu'un thread de requête bloqué plusieurs secondes
+    if not _places_file.acquire(blocking=False):
+        raise ServiceSature()
+    try:
+        futur = _obtenir_pool().submit(fonction, *args)
+    except Exception:
+        _places_file.release()
+        raise
+    # La place n'est libérée que quand le hachage est vraiment terminé :
+    # un hachage abandonné (délai dépassé) continue de compter dans la file
+    futur.add_done_callback(lambda _: _places_file.release())
+    try:
+        return futur.result(timeout=DELAI_HACHAGE)
+    except FuturesTimeoutError:
+        futur.cancel()  # retire le travail s'il n'a pas encore démarré
+        raise ServiceSature()
+
+
+def hacher_mot_de_passe(mot_de_passe):
+    """Hache un mot de passe dans le pool de processus"""
+    return _executer_dans_pool(_hacher, mot_de_passe)
+
+
+def verifier_mot_de_passe(mot_de_passe, empreinte_stockee):
+    """Vérifie un mot de passe dans le pool de processus"""
+    return _executer_dans_pool(_verifier, mot_de_passe, empreinte_stockee)
+
+
+# Empreinte factice : pour un utilisateur inconnu on fait quand même un hachage,
+# sinon le temps de réponse révélerait quels noms d'utilisateur existent
+_EMPREINTE_FACTICE = None
+
+
+def empreinte_factice():
+    global _EMPREINTE_FACTICE
+    if _EMPREINTE_FACTICE is None:
+        _EMPREINTE_FACTICE = hacher_mot_de_passe(secrets.token_hex(8))
+    return _EMPREINTE_FACTICE
+
+
+# ------------------ Stockage des utilisateurs (fichier JSON) ------------------
+class StockUtilisateurs:
+    """
+    Utilisateurs enregistrés dans un fichier JSON (donnees/utilisateurs.json)
+
+    Format du fichier:
+        {"prochain_id": 2, "utilisateurs": {"nom": {"id_utilisateur": 1, ...}}}
+    """
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self._verrou = threading.Lock()
+        self._donnees = self._charger()
+
+    def _charger(self):
+        if not os.path.exists(self.chemin):
+            return {'prochain_id': 1, 'utilisateurs': {}}
+        with open(self.chemin, 'r', encoding='utf-8') as fichier:
+            return json.load(fichier)
+
+    def _sauvegarder(self):
+        # Écriture dans un fichier temporaire puis renommage (pas de fichier à moitié écrit)
+        os.makedirs(os.path.dirname(self.chemin), exist_ok=True)
+        temporaire = self.chemin + '.tmp'
+        with open(temporaire, 'w', encoding='utf-8') as fichier:
+            json.dump(self._donnees, fichier, ensure_ascii=False, indent=2)
+        os.replace(temporaire, self.chemin)
+
+    def trouver(self, nom_utilisateur):
+        """Retourne l'utilisateur (dictionnaire) ou None"""
+        with self._verrou:
+            return self._donnees['utilisateurs'].get(nom_utilisateur)
+
+    def creer(self, nom_utilisateur, empreinte, email=None):
+        """Enregistre un nouvel utilisateur, retourne None si le nom est déjà pris"""
+        with self._verrou:
+            if nom_utilisateur in self._donnees['utilisateurs']:
+                return None
+            utilisateur = {
+                'id_utilisateur': self._donnees['prochain_id'],
+                'nom_utilisateur': nom_utilisateur,
+                'email': email,
+                'mot_de_passe': empreinte
+            }
+            self._donnees['utilisateurs'][nom_utilisateur] = utilisateur
+            self._donnees['prochain_id'] += 1
+            self._sauvegarder()
+            return utilisateur
+
+
+# ------------------ Jetons signés + cache LRU ------------------
+class GestionnaireJetons:
+    """
+    Génère et vérifie les jetons d'authentification
+
+    Les jetons déjà vérifiés sont gardés dans un cache LRU (jeton -> données,
+    date d'expiration) : un appel authentifié ne recalcule la signature HMAC
+    qu'à la première utilisation du jeton.
+    """
+
+    def __init__(self, cle_secrete, duree_validite=3600, taille_cache=1024):
+        self.duree_validite = duree_validite
+        self.taille_cache = taille_cache
+        self._signataire = URLSafeTimedSerializer(cle_secrete, salt='mysurf-authentification')
+        self._cache = OrderedDict()
+        self._verrou = threading.Lock()
+
+    def generer(self, utilisateur):
+        return self._signataire.dumps({
+            'id_utilisateur': utilisateur['id_utilisateur'],
+            'nom_utilisateur': utilisateur['nom_utilisateur']
+        })
+
+    def verifier(self, jeton):
+        """Retourne les données du jeton, ou None s'il est invalide ou expiré"""
+        maintenant = time.time()
+        with self._verrou:
+            entree = self._cache.get(jeton)
+            if entree is not None:
+                donnees, expiration = entree
+                if expiration > maintenant:
+                    self._cache.move_to_end(jeton)
+                    return donnees
+                del self._cache[jeton]
+
+        try:
+            donnees, signe_le = self._signataire.loads(
+                jeton, max_age=self.duree_validite, return_timestamp=True
+            )
+        except (BadSignature, SignatureExpired):
+            return None
+
+        expiration = signe_le.timestamp() + self.duree_validite
+        with self._verrou:
+            self._cache[jeton] = (donnees, expiration)
+            self._cache.move_to_end(jeton)
+            while len(self._cache) > self.taille_cache:
+                self._cache.popitem(last=False)
+        return donnees
+
+
+def jeton_requis(gestionnaire):
+    """
+    Décorateur pour les routes qui demandent un utilisateur connecté
+
+    Le jeton est lu dans l'en-tête "Authorization: Bearer <jeton>".
+    Les données du jeton sont disponibles dans g.utilisateur.
+    """
+    def decorateur(route):
+        @wraps(route)
+        def route_protegee(*args, **kwargs):
+            entete = request.headers.get('Authorization', '')
+            jeton = entete[7:] if entete.startswith('Bearer ') else None
+            donnees = gestionnaire.verifier(jeton) if jeton else None
+            if donnees is None:
+                return jsonify({
+                    'succes': False,
+                    'message': 'Jeton absent, invalide ou expiré'
+                }), 401
+            g.utilisateur = donnees
+            return route(*args, **kwargs)
+        return route_protegee
+    return decorateur
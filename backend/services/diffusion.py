@@ -0,0 +1,180 @@
+"""
+MySurf API - Diffusion temps réel (Server-Sent Events)
+Pousse les nouvelles conditions/prévisions aux navigateurs abonnés
+
+Un seul Diffuseur est partagé par toutes les connexions :
+    - chaque publication est encodée UNE fois en message SSE (bytes),
+      puis ce même objet est envoyé à tous les abonnés du spot
+    - le diffuseur ne garde que le DERNIER message de chaque spot :
+      pas de file par connexion, un client lent saute simplement
+      les versions intermédiaires
+    - un abonnement ne contient que la liste des spots suivis et la
+      dernière version envoyée pour chacun (quelques dizaines d'octets)
+
+Attention: avec le serveur de développement (threaded=True), chaque
+connexion ouverte occupe en plus un thread système pendant toute sa durée.
+Le nombre de flux simultanés est donc plafonné (max_abonnes) ; au-delà,
+abonner() lève FluxSature et la route répond 503.
+
+Une publication identique à la précédente (même signature) est ignorée :
+les clients ne reçoivent un message que quand une nouvelle prévision arrive.
+"""
+
+import json
+import threading
+
+# Nombre maximum de spots suivis par une même connexion
+MAX_SPOTS_PAR_ABONNEMENT = 10
+
+# Commentaire SSE envoyé quand rien ne se passe (garde la connexion ouverte
+# à travers les proxys et permet de détecter les clients déconnectés)
+BATTEMENT = b': battement\n\n'
+
+
+class FluxSature(Exception):
+    """Levée quand le nombre maximum de flux simultanés est atteint"""
+
+
+class Abonnement:
+    """
+    Connexion d'un client à un ou plusieurs spots
+
+    versions_vues[i] est la version du dernier message envoyé pour ids_spots[i]
+    (0 = rien envoyé, le client reçoit donc l'état courant dès sa connexion).
+    """
+
+    __slots__ = ('_diffuseur', '_condition', 'ids_spots', 'versions_vues')
+
+    def __init__(self, diffuseur, condition, ids_spots):
+        self._diffuseur = diffuseur
+        self._condition = condition
+        self.ids_spots = ids_spots
+        self.versions_vues = [0] * len(ids_spots)
+
+    def _a_du_nouveau(self):
+        derniers = self._diffuseur._derniers
+        for id_spot, vue in zip(self.ids_spots, self.versions_vues):
+            entree = derniers.get(id_spot)
+            if entree is not None and entree[0] > vue:
+                return True
+        return False
+
+    def messages_en_attente(self):
+        """Retourne (sans attendre) les messages plus récents que ceux déjà envoyés"""
+        messages = []
+        derniers = self._diffuseur._derniers
+        for i, id_spot in enumerate(self.ids_spots):
+            entree = derniers.get(id_spot)
+            if entree is not None and entree[0] > self.versions_vues[i]:
+                self.versions_vues[i] = entree[0]
+                messages.append(entree[2])
+        return messages
+
+    def attendre(self, delai):
+        """Attend une nouvelle publication pour un des spots suivis (False si délai écoulé)"""
+        with self._condition:
+            return self._condition.wait_for(self._a_du_nouveau, delai)
+
+
+class Diffuseur:
+    """Fan-out unique des mises à jour vers toutes les connexions SSE"""
+
+    def __init__(self, delai_battement=15.0, max_abonnes=None):
+        self.delai_battement = delai_battement
+        self.max_abonnes = max_abonnes  # None = pas de plafond
+        self._verrou = threading.Lock()
+        self._version = 0
+        # id_spot -> (version, signature, message SSE encodé)
+        self._derniers = {}
+        # Une condition par combinaison de spots suivis (toutes sur le même verrou):
+        # une publication ne réveille que les connexions concernées par ce spot
+        # ids_spots -> [condition, nombre d'abonnés]
+        self._conditions = {}
+        self.nombre_abonnes = 0
+
+    def publier(self, id_spot, donnees, signature=None):
+        """
+        Publie de nouvelles données pour un spot
+
+        Args:
+            id_spot: identifiant du spot
+            donnees: dictionnaire envoyé en JSON aux clients
+            signature: valeur qui identifie le contenu (par défaut le JSON lui-même) ;
+                       si elle n'a pas changé depuis la dernière publication, rien n'est envoyé
+
+        Retourne:
+            True si un message a été diffusé
+        """
+        texte = json.dumps(donnees, ensure_ascii=False, separators=(',', ':'))
+        if signature is None:
+            signature = texte
+
+        with self._verrou:
+            precedent = self._derniers.get(id_spot)
+            if precedent is not None and precedent[1] == signature:
+                return False
+            self._version += 1
+            message = f'event: mise_a_jour\nid: {self._version}\ndata: {texte}\n\n'.encode('utf-8')
+            self._derniers[id_spot] = (self._version, signature, message)
+            for ids_spots, (condition, _) in self._conditions.items():
+                if id_spot in ids_spots:
+                    condition.notify_all()
+        return True
+
+    def abonner(self, ids_spots):
+        ids_spots = tuple(sorted(set(ids_spots)))
+        with self._verrou:
+            if self.max_abonnes is not None and self.nombre_abonnes >= self.max_abonnes:
+                raise FluxSature()
+            entree = self._conditions.get(ids_spots)
+            if entree is None:
+                entree = self._conditions[ids_spots] = [threading.Condition(self._verrou), 0]
+            entree[1] += 1
+            self.nombre_abonnes += 1
+        return Abonnement(self, entree[0], ids_spots)
+
+    def desabonner(self, abonnement):
+        with self._verrou:
+            entree = self._conditions[abonnement.ids_spots]
+            entree[1] -= 1
+            if entree[1] == 0:
+                del self._conditions[abonnement.ids_spots]
+            self.nombre_abonnes -= 1
+
+    def flux(self, ids_spots):
+        """
+        Ouvre un flux SSE pour une connexion (à passer à flask.Response)
+
+        L'abonnement est pris tout de suite (FluxSature si le plafond est atteint),
+        avant l'envoi de la réponse. Le serveur appelle close() à la déconnexion
+        du client, même si aucun message n'a encore été envoyé.
+        """
+        return FluxSSE(self, self.abonner(ids_spots))
+
+
+class FluxSSE:
+    """Itérateur de messages SSE d'une connexion ; close() libère l'abonnement"""
+
+    __slots__ = ('_diffuseur', '_abonnement', '_ferme')
+
+    def __init__(self, diffuseur, abonnement):
+        self._diffuseur = diffuseur
+        self._abonnement = abonnement
+        self._ferme = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while not self._ferme:
+            messages = self._abonnement.messages_en_attente()
+            if messages:
+                return b''.join(messages)
+            if not self._abonnement.attendre(self._diffuseur.delai_battement):
+                return BATTEMENT
+        raise StopIteration
+
+    def close(self):
+        if not self._ferme:
+            self._ferme = True
+            self._diffuseur.desabonner(self._abonnement)
@@ -0,0 +1,159 @@
+"""
+MySurf API - Limitation de débit et contrôle d'admission
+Protège les routes coûteuses contre les scripts qui bouclent sur l'API
+
+Deux protections, configurables route par route (app.config['LIMITES_ROUTES']):
+    - un seau à jetons par client (clé API connue ou adresse IP) : chaque requête
+      consomme "cout" jetons, le seau se remplit de "debit" jetons/seconde
+      jusqu'à "rafale" jetons. Seau vide -> 429 + Retry-After
+    - une limite globale de requêtes simultanées ("simultanees") avec une
+      petite file d'attente bornée ("file", "attente_max" secondes).
+      File pleine ou attente trop longue -> 503 + Retry-After
+
+Les refus sont immédiats : un client refusé ne bloque aucun thread.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, jsonify, request
+
+# Nombre maximum de clients suivis (les plus anciens sont oubliés au-delà)
+MAX_CLIENTS_SUIVIS = 10000
+
+
+class Refus(Exception):
+    """Requête refusée : code HTTP (429 ou 503) et délai conseillé avant de réessayer"""
+
+    def __init__(self, code, reessayer_dans, message):
+        super().__init__(message)
+        self.code = code
+        self.reessayer_dans = reessayer_dans
+        self.message = message
+
+
+class SeauxJetons:
+    """Un seau à jetons par (route, client), gardé dans un dictionnaire LRU borné"""
+
+    def __init__(self, max_clients=MAX_CLIENTS_SUIVIS):
+        self.max_clients = max_clients
+        self._seaux = OrderedDict()  # (route, client) -> [jetons, dernière mise à jour]
+        self._verrou = threading.Lock()
+
+    def prendre(self, cle, cout, debit, rafale):
+        """Consomme cout jetons, ou lève Refus(429) si le seau n'en contient pas assez"""
+        maintenant = time.monotonic()
+        with self._verrou:
+            seau = self._seaux.get(cle)
+            if seau is None:
+                seau = self._seaux[cle] = [float(rafale), maintenant]
+                if len(self._seaux) > self.max_clients:
+                    self._seaux.popitem(last=False)
+            else:
+                self._seaux.move_to_end(cle)
+                seau[0] = min(rafale, seau[0] + (maintenant - seau[1]) * debit)
+                seau[1] = maintenant
+
+            if seau[0] >= cout:
+                seau[0] -= cout
+                return
+            manque = cout - seau[0]
+
+        raise Refus(429, math.ceil(manque / debit), 'Trop de requêtes, ralentissez')
+
+
+class ControleAdmission:
+    """Limite le nombre de requêtes simultanées par route, avec une file d'attente bornée"""
+
+    def __init__(self):
+        self._routes = {}  # route -> [condition, en cours, en attente]
+        self._verrou = threading.Lock()
+
+    def _etat(self, route):
+        with self._verrou:
+            if route not in self._routes:
+                self._routes[route] = [threading.Condition(), 0, 0]
+            return self._routes[route]
+
+    def entrer(self, route, simultanees, file, attente_max):
+        """Réserve une place (ou lève Refus(503)) ; à libérer avec sortir()"""
+        etat = self._etat(route)
+        condition = etat[0]
+        with condition:
+            if etat[1] < simultanees:
+                etat[1] += 1
+                return
+            if etat[2] >= file:
+                raise Refus(503, 1, 'Serveur saturé, réessayez dans un instant')
+            etat[2] += 1
+            try:
+                libre = condition.wait_for(lambda: etat[1] < simultanees, attente_max)
+            finally:
+                etat[2] -= 1
+            if not libre:
+                raise Refus(503, 1, 'Serveur saturé, réessayez dans un instant')
+            etat[1] += 1
+
+    def sortir(self, route):
+        etat = self._etat(route)
+        with etat[0]:
+            etat[1] -= 1
+            etat[0].notify()
+
+
+seaux = SeauxJetons()
+admission = ControleAdmission()
+
+
+def identifier_client():
+    """
+    Clé API (en-tête X-API-Key) si elle fait partie de app.config['CLES_API'],
+    sinon adresse IP
+
+    Une clé inconnue est ignorée: sinon un client pourrait changer de clé à
+    chaque requête pour avoir un seau neuf à chaque fois.
+    """
+    cle = request.headers.get('X-API-Key')
+    if cle and cle in current_app.config.get('CLES_API', ()):
+        return f'cle:{cle}'
+    return request.remote_addr or 'inconnu'
+
+
+def limiter(nom_route):
+    """
+    Décorateur qui applique les limites de app.config['LIMITES_ROUTES'][nom_route]
+
+    Clés possibles (toutes optionnelles):
+        debit, rafale, cout : seau à jetons par client
+        simultanees, file, attente_max : limite globale de requêtes simultanées
+    Une route absente de la configuration n'est pas limitée.
+    """
+    def decorateur(route):
+        @wraps(route)
+        def route_limitee(*args, **kwargs):
+            limites = current_app.config.get('LIMITES_ROUTES', {}).get(nom_route)
+            if not limites:
+                return route(*args, **kwargs)
+
+            try:
+                if 'debit' in limites:
+                    seaux.prendre((nom_route, identifier_client()), limites.get('cout', 1),
+                                  limites['debit'], limites.get('rafale', limites['debit']))
+                if 'simultanees' not in limites:
+                    return route(*args, **kwargs)
+                admission.entrer(nom_route, limites['simultanees'],
+                                 limites.get('file', 0), limites.get('attente_max', 0.5))
+            except Refus as refus:
+                reponse = jsonify({'succes': False, 'message': refus.message})
+                reponse.headers['Retry-After'] = str(refus.reessayer_dans)
+                return reponse, refus.code
+
+            try:
+                return route(*args, **kwargs)
+            finally:
+                admission.sortir(nom_route)
+        return route_limitee
+    return decorateur
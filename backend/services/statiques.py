@@ -0,0 +1,171 @@
+"""
+MySurf API - Fichiers statiques du frontend
+Préparés une seule fois au démarrage puis servis depuis la mémoire
+
+Au démarrage:
+    - chaque fichier (app.js, style.css, ...) reçoit un nom avec l'empreinte
+      de son contenu: app.js -> app.3f2a9c1b7d.js
+    - les versions gzip et brotli sont calculées à l'avance
+    - index.html est réécrit pour pointer vers les noms avec empreinte
+
+À chaque requête, il n'y a plus qu'à choisir la bonne version selon
+l'en-tête Accept-Encoding. Un fichier avec empreinte ne change jamais:
+le navigateur peut le garder un an (Cache-Control: immutable).
+index.html garde son nom et est revalidé à chaque visite (ETag -> 304).
+
+Le module brotli fait partie de requirements.txt. S'il manque quand même,
+le serveur démarre en mode dégradé (gzip seulement) et le signale au démarrage.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # brotli non installé: mode dégradé, gzip seulement
+    brotli = None
+
+# Fichiers dont le contenu est réécrit pour pointer vers les noms avec empreinte
+PAGES_HTML = ('.html',)
+# Types de fichiers qui valent la peine d'être compressés
+EXTENSIONS_COMPRESSIBLES = ('.html', '.css', '.js', '.json', '.svg', '.txt')
+
+CACHE_IMMUABLE = 'public, max-age=31536000, immutable'
+CACHE_REVALIDATION = 'no-cache'
+
+# Attributs src="..." et href="..." dans les pages HTML
+REFERENCE_HTML = re.compile(r'((?:src|href)=["\'])([^"\']+)(["\'])')
+
+
+class Actif:
+    """Un fichier prêt à être servi: versions identity / gzip / br et leurs ETag"""
+
+    def __init__(self, contenu, type_mime, empreinte, compressible):
+        if type_mime.startswith('text/') or type_mime == 'application/javascript':
+            type_mime += '; charset=utf-8'
+        self.type_contenu = type_mime
+        # encodage -> (contenu, etag)
+        self.versions = {'identity': (contenu, empreinte)}
+
+        if compressible:
+            versions_compressees = {'gzip': gzip.compress(contenu, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                versions_compressees['br'] = brotli.compress(contenu, quality=11)
+            for encodage, donnees in versions_compressees.items():
+                # Inutile de garder une version compressée plus grosse que l'originale
+                if len(donnees) < len(contenu):
+                    self.versions[encodage] = (donnees, f'{empreinte}-{encodage}')
+
+
+class ActifsStatiques:
+    """
+    Tous les fichiers d'un dossier, préparés en mémoire au démarrage
+
+    Args:
+        dossier: chemin du dossier frontend
+        page_accueil: fichier servi pour "/" (index.html)
+    """
+
+    def __init__(self, dossier, page_accueil='index.html'):
+        self.dossier = dossier
+        self.page_accueil = page_accueil
+        self.noms_empreinte = {}  # 'app.js' -> 'app.3f2a9c1b7d.js'
+        self._actifs = {}         # chemin demandé -> Actif
+        self._immuables = set()   # chemins avec empreinte (cache d'un an)
+        if brotli is None:
+            print('ATTENTION: module brotli absent (pip install -r requirements.txt), '
+                  'fichiers statiques servis en gzip seulement')
+        self._preparer()
+
+    def _lister(self):
+        for racine, dossiers, fichiers in os.walk(self.dossier):
+            dossiers[:] = [d for d in dossiers if not d.startswith('.')]
+            for nom in fichiers:
+                if not nom.startswith('.'):
+                    chemin = os.path.join(racine, nom)
+                    yield os.path.relpath(chemin, self.dossier).replace(os.sep, '/'), chemin
+
+    def _preparer(self):
+        pages = []
+        for relatif, chemin in self._lister():
+            with open(chemin, 'rb') as fichier:
+                contenu = fichier.read()
+            if relatif.endswith(PAGES_HTML):
+                pages.append((relatif, contenu))
+                continue
+
+            empreinte = hashlib.sha256(contenu).hexdigest()[:10]
+            base, extension = os.path.splitext(relatif)
+            nom_empreinte = f'{base}.{empreinte}{extension}'
+            type_mime = mimetypes.guess_type(relatif)[0] or 'application/octet-stream'
+            compressible = extension.lower() in EXTENSIONS_COMPRESSIBLES
+
+            self.noms_empreinte[relatif] = nom_empreinte
+            actif = Actif(contenu, type_mime, empreinte, compressible)
+            self._actifs[nom_empreinte] = actif
+            self._immuables.add(nom_empreinte)
+            # L'ancien nom reste disponible (mêmes données en mémoire), mais doit être revalidé
+            self._actifs[relatif] = actif
+
+        # Les pages HTML en dernier: elles pointent vers les noms avec empreinte
+        for relatif, contenu in pages:
+            contenu = self._reecrire_references(relatif, contenu.decode('utf-8')).encode('utf-8')
+            empreinte = hashlib.sha256(contenu).hexdigest()[:10]
+            self._actifs[relatif] = Actif(contenu, 'text/html', empreinte, compressible=True)
+
+    def _reecrire_references(self, page, html):
+        dossier_page = os.path.dirname(page)
+
+        def remplacer(correspondance):
+            debut, reference, fin = correspondance.groups()
+            if '://' in reference or reference.startswith(('//', '#', 'data:')):
+                return correspondance.group(0)
+            absolu = reference.startswith('/')
+            cible = reference.lstrip('/') if absolu else os.path.normpath(
+                os.path.join(dossier_page, reference)).replace(os.sep, '/')
+            nom_empreinte = self.noms_empreinte.get(cible)
+            if nom_empreinte is None:
+                return correspondance.group(0)
+            if not absolu:
+                nom_empreinte = os.path.relpath(nom_empreinte, dossier_page or '.').replace(os.sep, '/')
+            return f'{debut}{"/" if absolu else ""}{nom_empreinte}{fin}'
+
+        return REFERENCE_HTML.sub(remplacer, html)
+
+    def reponse(self, chemin, requete):
+        """
+        Construit la réponse pour un fichier (None s'il n'existe pas)
+
+        Choisit br, puis gzip, puis la version non compressée selon
+        Accept-Encoding, et répond 304 si le navigateur a déjà cette version.
+        """
+        chemin = chemin or self.page_accueil
+        actif = self._actifs.get(chemin)
+        if actif is None:
+            return None
+
+        acceptes = requete.accept_encodings
+        encodage = next(
+            (e for e in ('br', 'gzip') if e in actif.versions and acceptes[e]),
+            'identity'
+        )
+        contenu, etag = actif.versions[encodage]
+
+        entetes = {
+            'Cache-Control': CACHE_IMMUABLE if chemin in self._immuables else CACHE_REVALIDATION,
+            'Vary': 'Accept-Encoding',
+        }
+        if encodage != 'identity':
+            entetes['Content-Encoding'] = encodage
+
+        if requete.if_none_match.contains(etag):
+            reponse = Response(status=304, headers=entetes)
+        else:
+            reponse = Response(contenu, content_type=actif.type_contenu, headers=entetes)
+        reponse.set_etag(etag)
+        return reponse
@@ -0,0 +1,285 @@
+"""
+MySurf API - Test de montée en charge du flux temps réel (/api/flux)
+
+Lance un serveur SSE de test dans un processus séparé : même modèle que le
+serveur de développement Flask (un thread par connexion) et même Diffuseur
+(backend/services/diffusion.py), avec une source de prévisions simulée.
+Le processus principal ouvre ensuite de VRAIES connexions TCP :
+
+    1. Mémoire : RSS du serveur (/proc/<pid>/status) avant et après
+       l'ouverture de N connexions, et nombre de threads
+    2. Latence : publie des prévisions (dont certaines identiques, qui ne
+       doivent rien envoyer) et mesure le délai publication -> réception
+       sur toutes les connexions
+    3. Plafond : une connexion au-delà de --plafond doit recevoir un 503
+    4. Fan-out : temps CPU du Diffuseur seul pour servir --abonnements
+       abonnements (sans réseau ni threads)
+
+Linux uniquement (lecture de /proc). Pour beaucoup de connexions, augmenter
+la limite de fichiers ouverts (ulimit -n).
+
+Utilisation:
+    python benchmarks/connexions_flux.py [--connexions 2000] [--plafond 2000]
+"""
+
+import argparse
+import json
+import os
+import random
+import selectors
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from services.diffusion import Diffuseur, FluxSature  # noqa: E402
+
+HOTE = '127.0.0.1'
+IDS_SPOTS = [1, 2, 3, 4, 5]
+
+
+class SourceSimulee:
+    """Remplace l'API météo : une nouvelle prévision une fois sur deux"""
+
+    def __init__(self, graine=42):
+        self._hasard = random.Random(graine)
+        self._dernieres = {}
+
+    def prevision(self, id_spot):
+        if id_spot in self._dernieres and self._hasard.random() < 0.5:
+            return self._dernieres[id_spot]  # pas de changement
+        donnees = {
+            'id_spot': id_spot,
+            'envoye_a': time.time(),  # horloge murale: lue dans un autre processus
+            'conditions': {'vague': {'hauteur': round(self._hasard.uniform(0.5, 3.0), 1)}},
+            'previsions': [{'jour': j, 'note': self._hasard.randint(1, 5)} for j in range(5)]
+        }
+        self._dernieres[id_spot] = donnees
+        return donnees
+
+
+def spots_aleatoires(hasard):
+    return hasard.sample(IDS_SPOTS, hasard.randint(1, 3))
+
+
+def lire_status(pid):
+    """RSS (Ko) et nombre de threads d'un processus"""
+    valeurs = {}
+    with open(f'/proc/{pid}/status') as fichier:
+        for ligne in fichier:
+            cle, _, valeur = ligne.partition(':')
+            valeurs[cle] = valeur.split()[0] if valeur.split() else ''
+    return int(valeurs['VmRSS']), int(valeurs['Threads'])
+
+
+# ------------------ Serveur de test (processus enfant) ------------------
+def lancer_serveur(port, plafond):
+    diffuseur = Diffuseur(delai_battement=30.0, max_abonnes=plafond)
+    source = SourceSimulee()
+
+    class Gestionnaire(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def repondre_json(self, code, donnees):
+            corps = json.dumps(donnees).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(corps)))
+            self.end_headers()
+            self.wfile.write(corps)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/etat':
+                rss, threads = lire_status(os.getpid())
+                return self.repondre_json(200, {'abonnes': diffuseur.nombre_abonnes,
+                                                'rss_ko': rss, 'threads': threads})
+            ids_spots = [int(x) for x in parse_qs(url.query)['spots'][0].split(',')]
+            try:
+                flux = diffuseur.flux(ids_spots)
+            except FluxSature:
+                return self.repondre_json(503, {'succes': False})
+            try:
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.end_headers()
+                self.wfile.flush()
+                for bloc in flux:
+                    self.wfile.write(bloc)
+                    self.wfile.flush()
+            except OSError:
+                pass  # client déconnecté
+            finally:
+                flux.close()
+
+        def do_POST(self):
+            id_spot = int(parse_qs(urlparse(self.path).query)['spot'][0])
+            diffuse = diffuseur.publier(id_spot, source.prevision(id_spot))
+            self.repondre_json(200, {'diffuse': diffuse})
+
+    class Serveur(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 4096  # lu par listen() à la construction
+
+    Serveur((HOTE, port), Gestionnaire).serve_forever()
+
+
+# ------------------ Client (processus principal) ------------------
+def appeler(port, methode, chemin):
+    requete = urllib.request.Request(f'http://{HOTE}:{port}{chemin}', method=methode)
+    try:
+        with urllib.request.urlopen(requete, timeout=30) as reponse:
+            return reponse.status, json.loads(reponse.read())
+    except urllib.error.HTTPError as erreur:
+        return erreur.code, None
+
+
+def attendre_serveur(port, delai=10):
+    fin = time.time() + delai
+    while True:
+        try:
+            return appeler(port, 'GET', '/etat')[1]
+        except OSError:
+            if time.time() > fin:
+                raise
+            time.sleep(0.1)
+
+
+def attendre_abonnes(port, nombre, delai=60):
+    fin = time.time() + delai
+    while time.time() < fin:
+        _, etat = appeler(port, 'GET', '/etat')
+        if etat['abonnes'] >= nombre:
+            return etat
+        time.sleep(0.2)
+    return etat
+
+
+def ouvrir_connexion(port, ids_spots):
+    s = socket.create_connection((HOTE, port), timeout=30)
+    spots = ','.join(str(i) for i in ids_spots)
+    s.sendall(f'GET /flux?spots={spots} HTTP/1.0\r\nHost: {HOTE}\r\n\r\n'.encode())
+    return s
+
+
+def mesurer_connexions(port, pid, nombre, publications):
+    hasard = random.Random(3)
+    rss_repos, threads_repos = lire_status(pid)
+
+    connexions = []
+    for _ in range(nombre):
+        connexions.append(ouvrir_connexion(port, spots_aleatoires(hasard)))
+    etat = attendre_abonnes(port, nombre)
+    ouvertes = etat['abonnes']
+    delta = etat['rss_ko'] - rss_repos
+    print(f'Mémoire  : {ouvertes} connexions HTTP ouvertes -> RSS serveur {rss_repos} Ko -> {etat["rss_ko"]} Ko '
+          f'(+{delta / max(ouvertes, 1):.1f} Ko par connexion), threads {threads_repos} -> {etat["threads"]}')
+
+    # Lecture de toutes les connexions pendant les publications
+    selecteur = selectors.DefaultSelector()
+    for s in connexions:
+        s.setblocking(False)
+        selecteur.register(s, selectors.EVENT_READ, bytearray())
+    latences, arret = [], threading.Event()
+
+    def lire():
+        while not arret.is_set():
+            for cle, _ in selecteur.select(timeout=0.2):
+                recu = time.time()
+                try:
+                    donnees = cle.fileobj.recv(65536)
+                except BlockingIOError:
+                    continue
+                tampon = cle.data
+                tampon.extend(donnees)
+                while b'\n\n' in tampon:
+                    bloc, _, reste = bytes(tampon).partition(b'\n\n')
+                    tampon[:] = reste
+                    for ligne in bloc.split(b'\n'):
+                        if ligne.startswith(b'data: '):
+                            latences.append(recu - json.loads(ligne[6:])['envoye_a'])
+
+    lecteur = threading.Thread(target=lire)
+    lecteur.start()
+    diffusees = 0
+    for i in range(publications):
+        _, reponse = appeler(port, 'POST', f'/publier?spot={IDS_SPOTS[i % len(IDS_SPOTS)]}')
+        diffusees += reponse['diffuse']
+        time.sleep(0.1)
+    time.sleep(1.0)
+    arret.set()
+    lecteur.join()
+
+    if len(latences) >= 2:
+        q = statistics.quantiles(latences, n=100)
+        print(f'Latence  : {publications} publications ({diffusees} diffusées, {publications - diffusees} inchangées), '
+              f'{len(latences)} messages reçus, p50={q[49] * 1000:.1f} ms  p95={q[94] * 1000:.1f} ms  '
+              f'p99={q[98] * 1000:.1f} ms')
+    return connexions
+
+
+def verifier_plafond(port):
+    s = ouvrir_connexion(port, [1])
+    s.settimeout(10)
+    premiere_ligne = s.recv(1024).split(b'\r\n', 1)[0].decode()
+    s.close()
+    print(f'Plafond  : connexion supplémentaire -> {premiere_ligne}')
+
+
+def mesurer_fan_out(nombre, publications):
+    diffuseur, source = Diffuseur(), SourceSimulee()
+    hasard = random.Random(2)
+    abonnements = [diffuseur.abonner(spots_aleatoires(hasard)) for _ in range(nombre)]
+    durees = []
+    for i in range(publications):
+        id_spot = IDS_SPOTS[i % len(IDS_SPOTS)]
+        if not diffuseur.publier(id_spot, source.prevision(id_spot)):
+            continue
+        debut = time.perf_counter()
+        for abonnement in abonnements:
+            abonnement.messages_en_attente()
+        durees.append(time.perf_counter() - debut)
+    print(f'Fan-out  : {statistics.mean(durees) * 1000:.1f} ms de CPU en moyenne par publication '
+          f'pour {nombre} abonnements (Diffuseur seul)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--connexions', type=int, default=2000, help='connexions HTTP réellement ouvertes')
+    parser.add_argument('--plafond', type=int, default=None, help='max_abonnes du serveur (défaut: --connexions)')
+    parser.add_argument('--publications', type=int, default=20, help='nombre de prévisions publiées')
+    parser.add_argument('--abonnements', type=int, default=10000, help='abonnements pour la mesure de fan-out')
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--serveur', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    plafond = args.plafond if args.plafond is not None else args.connexions
+
+    if args.serveur:
+        return lancer_serveur(args.port, plafond)
+
+    serveur = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serveur',
+                                '--port', str(args.port), '--plafond', str(plafond)])
+    try:
+        attendre_serveur(args.port)
+        print('=' * 60)
+        connexions = mesurer_connexions(args.port, serveur.pid, min(args.connexions, plafond), args.publications)
+        verifier_plafond(args.port)
+        for s in connexions:
+            s.close()
+        mesurer_fan_out(args.abonnements, args.publications)
+        print('=' * 60)
+    finally:
+        serveur.terminate()
+        serveur.wait()
+
+
+if __name__ == '__main__':
+    main()
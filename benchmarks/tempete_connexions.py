@@ -0,0 +1,139 @@
+"""
+MySurf API - Benchmark "tempête de connexions"
+
+Lance le serveur Flask en local (multi-thread), puis envoie une rafale de
+POST /api/connexion depuis plusieurs threads. Pendant la rafale, un thread
+"sonde" appelle en boucle GET /api/spots et GET /api/profil (route protégée
+par jeton) et mesure leur latence.
+
+Affiche:
+    - le débit de connexions (réussies / refusées en 503)
+    - la latence p50 / p95 / p99 des autres routes, avant et pendant la rafale
+
+Utilisation:
+    python benchmarks/tempete_connexions.py [--connexions 200] [--threads 32]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+# Clé de signature jetable pour le benchmark (app.py refuse de démarrer sans clé)
+os.environ.setdefault('MYSURF_SECRET_KEY', 'benchmark-' + os.urandom(16).hex())
+
+from werkzeug.serving import make_server  # noqa: E402
+
+import app as application  # noqa: E402
+from services.authentification import StockUtilisateurs  # noqa: E402
+
+HOTE = '127.0.0.1'
+PORT = 5055
+URL = f'http://{HOTE}:{PORT}'
+
+
+def appeler(methode, chemin, corps=None, jeton=None):
+    """Envoie une requête et retourne (code HTTP, données JSON)"""
+    donnees = json.dumps(corps).encode('utf-8') if corps is not None else None
+    requete = urllib.request.Request(URL + chemin, data=donnees, method=methode)
+    requete.add_header('Content-Type', 'application/json')
+    if jeton:
+        requete.add_header('Authorization', f'Bearer {jeton}')
+    try:
+        with urllib.request.urlopen(requete, timeout=30) as reponse:
+            return reponse.status, json.loads(reponse.read())
+    except urllib.error.HTTPError as erreur:
+        return erreur.code, None
+
+
+def percentiles(valeurs):
+    if len(valeurs) < 2:
+        return 'pas assez de mesures'
+    q = statistics.quantiles(valeurs, n=100)
+    return f'p50={q[49] * 1000:.1f} ms  p95={q[94] * 1000:.1f} ms  p99={q[98] * 1000:.1f} ms  (n={len(valeurs)})'
+
+
+def sonder(jeton, arret, latences):
+    """Appelle les routes "légères" en boucle jusqu'à l'arrêt"""
+    while not arret.is_set():
+        for chemin, avec_jeton in (('/api/spots', False), ('/api/profil', True)):
+            debut = time.perf_counter()
+            appeler('GET', chemin, jeton=jeton if avec_jeton else None)
+            latences.append(time.perf_counter() - debut)
+        time.sleep(0.005)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--connexions', type=int, default=200, help='nombre total de connexions envoyées')
+    parser.add_argument('--threads', type=int, default=32, help='nombre de clients simultanés')
+    parser.add_argument('--utilisateurs', type=int, default=20, help='nombre de comptes créés')
+    args = parser.parse_args()
+
+    # Utilisateurs dans un fichier temporaire (ne touche pas à donnees/utilisateurs.json)
+    dossier = tempfile.mkdtemp(prefix='mysurf-bench-')
+    application.utilisateurs = StockUtilisateurs(os.path.join(dossier, 'utilisateurs.json'))
+    # Tous les clients du benchmark ont la même IP: on mesure le pool de hachage, pas la limitation
+    application.app.config['LIMITES_ROUTES'] = {}
+
+    serveur = make_server(HOTE, PORT, application.app, threaded=True)
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+
+    print(f'Création de {args.utilisateurs} comptes...')
+    for i in range(args.utilisateurs):
+        appeler('POST', '/api/inscription', {'nom_utilisateur': f'surfeur{i}', 'mot_de_passe': f'secret{i}'})
+    _, reponse = appeler('POST', '/api/connexion', {'nom_utilisateur': 'surfeur0', 'mot_de_passe': 'secret0'})
+    jeton = reponse['donnees']['jeton']
+
+    # 1) Latence de référence, sans rafale
+    arret, latences_repos = threading.Event(), []
+    sonde = threading.Thread(target=sonder, args=(jeton, arret, latences_repos))
+    sonde.start()
+    time.sleep(2)
+    arret.set()
+    sonde.join()
+
+    # 2) Rafale de connexions + sonde en parallèle
+    arret, latences_tempete = threading.Event(), []
+    sonde = threading.Thread(target=sonder, args=(jeton, arret, latences_tempete))
+    codes, verrou = {}, threading.Lock()
+    compteur = iter(range(args.connexions))
+
+    def client():
+        for i in compteur:
+            n = i % args.utilisateurs
+            code, _ = appeler('POST', '/api/connexion', {'nom_utilisateur': f'surfeur{n}', 'mot_de_passe': f'secret{n}'})
+            with verrou:
+                codes[code] = codes.get(code, 0) + 1
+
+    clients = [threading.Thread(target=client) for _ in range(args.threads)]
+    sonde.start()
+    debut = time.perf_counter()
+    for c in clients:
+        c.start()
+    for c in clients:
+        c.join()
+    duree = time.perf_counter() - debut
+    arret.set()
+    sonde.join()
+    serveur.shutdown()
+
+    print('=' * 60)
+    print(f'Rafale: {args.connexions} connexions, {args.threads} clients, {duree:.2f} s')
+    print(f'  Débit          : {args.connexions / duree:.1f} connexions/s')
+    print(f'  Codes HTTP     : {dict(sorted(codes.items()))}')
+    print('Latence /api/spots + /api/profil')
+    print(f'  Au repos       : {percentiles(latences_repos)}')
+    print(f'  Pendant rafale : {percentiles(latences_tempete)}')
+    print('=' * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,308 @@
+# climatology.py
+"""
+Climatologie des notes par spot et par mois.
+
+Une note "62/100" ne veut pas dire la même chose à Hossegor et à Guéthary :
+on la situe donc par rapport à l'historique du spot pour le même mois
+("top 10 % pour ce spot en octobre").
+
+Les notes sont des entiers de 0 à 100 : au lieu d'un sketch approché (t-digest),
+chaque (spot, mois) garde un histogramme exact de 101 compteurs et leurs
+cumuls. Ajout d'une note = mise à jour incrémentale des compteurs (pas de
+stockage des notes), percentile = deux lectures de tableau, O(1).
+Sur disque, seuls les compteurs non nuls sont écrits (JSON compact).
+
+Le nombre de spots suivis est borné (MAX_SPOTS) : quand c'est plein, un nouveau
+spot ne prend la place que d'un spot qui n'a plus rien reçu depuis STALE_DAYS
+jours (sinon il est ignoré) ; un client qui invente des positions ne peut donc
+pas effacer l'historique des spots réellement suivis. L'écriture du fichier se fait dans un thread à part
+(start_autosave), jamais pendant une requête ; elle fusionne avec ce qu'un autre
+processus (surf_score.py) a écrit entre-temps.
+"""
+import hashlib, json, os, threading, time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou entre processus
+    fcntl = None
+
+MIN_SCORE, MAX_SCORE = 0, 100
+# En dessous de ce nombre d'heures d'historique, le percentile n'est pas affiché
+MIN_HISTORY = 24
+# Nombre maximum de spots suivis (~20 Ko par spot au pire : 12 mois x 2 tableaux de 101 entiers)
+MAX_SPOTS = 500
+# Un spot sans nouvelle heure depuis ce nombre de jours peut céder sa place à un nouveau spot
+STALE_DAYS = 30
+# Grille des positions : 0.01° ~ 1 km, deux requêtes sur la même plage tombent dans la même case
+GRID_DECIMALS = 2
+MONTHS_FR = ["janvier", "février", "mars", "avril", "mai", "juin", "juillet",
+             "août", "septembre", "octobre", "novembre", "décembre"]
+
+
+class ScoreHistogram:
+    """Histogramme exact des notes 0..100 avec cumuls maintenus à chaque ajout."""
+    __slots__ = ("counts", "below", "total")
+
+    def __init__(self):
+        size = MAX_SCORE - MIN_SCORE + 1
+        self.counts = [0] * size
+        self.below = [0] * (size + 1)   # below[i] = nombre de notes < i
+        self.total = 0
+
+    def add(self, score, n=1):
+        i = min(max(int(score), MIN_SCORE), MAX_SCORE) - MIN_SCORE
+        self.counts[i] += n
+        self.total += n
+        below = self.below
+        for j in range(i + 1, len(below)):
+            below[j] += n
+
+    def percentile(self, score):
+        """Rang centile (0..100) : part de l'historique en dessous, à égalité comptée pour moitié."""
+        if not self.total:
+            return None
+        i = min(max(int(score), MIN_SCORE), MAX_SCORE) - MIN_SCORE
+        return 100.0 * (self.below[i] + 0.5 * self.counts[i]) / self.total
+
+    def to_sparse(self):
+        return {str(i + MIN_SCORE): c for i, c in enumerate(self.counts) if c}
+
+    @classmethod
+    def from_sparse(cls, data):
+        h = cls()
+        for score, count in data.items():
+            h.add(int(score), count)
+        return h
+
+
+class _History:
+    """Histogrammes par (spot, mois) et dernière heure notée par spot (ordre LRU), sans verrou."""
+    __slots__ = ("hist", "last_hour", "max_spots")
+
+    def __init__(self, max_spots):
+        self.hist = {}                   # (spot, mois 1..12) -> ScoreHistogram
+        self.last_hour = OrderedDict()   # spot -> dernière heure enregistrée (ISO), ordre LRU
+        self.max_spots = max_spots
+
+    def add(self, spot, hour_iso, score):
+        last = self.last_hour.get(spot)
+        if last is None:
+            if len(self.last_hour) >= self.max_spots and not self._evict_stale(hour_iso):
+                return False   # plein : un nouveau spot ne chasse pas un spot encore actif
+            self.last_hour[spot] = ""
+        else:
+            self.last_hour.move_to_end(spot)
+            if last >= hour_iso:
+                return False
+        self.last_hour[spot] = hour_iso
+        key = (spot, month_of(hour_iso))
+        hist = self.hist.get(key)
+        if hist is None:
+            hist = self.hist[key] = ScoreHistogram()
+        hist.add(score)
+        return True
+
+    def _forget(self, spot):
+        del self.last_hour[spot]
+        for month in range(1, 13):
+            self.hist.pop((spot, month), None)
+
+    def _evict_stale(self, hour_iso):
+        """Libère la place du spot le moins récemment noté s'il est inactif depuis STALE_DAYS jours."""
+        oldest, oldest_hour = next(iter(self.last_hour.items()))
+        cutoff = (datetime.fromisoformat(hour_iso) - timedelta(days=STALE_DAYS)).isoformat(timespec="minutes")
+        if oldest_hour >= cutoff:
+            return False
+        self._forget(oldest)
+        return True
+
+    def evict(self):
+        """Oublie les spots les moins récemment notés au-delà de max_spots (fichier trop gros)."""
+        while len(self.last_hour) > self.max_spots:
+            self._forget(next(iter(self.last_hour)))
+
+    @classmethod
+    def read(cls, path, max_spots):
+        history = cls(max_spots)
+        if not os.path.exists(path):
+            return history
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for spot, months in data.get("spots", {}).items():
+            for month, sparse in months.items():
+                history.hist[(spot, int(month))] = ScoreHistogram.from_sparse(sparse)
+            history.last_hour.setdefault(spot, "")
+        # last_hour est écrit dans l'ordre LRU (le plus ancien d'abord)
+        for spot, hour_iso in data.get("last_hour", {}).items():
+            history.last_hour[spot] = hour_iso
+            history.last_hour.move_to_end(spot)
+        history.evict()
+        return history
+
+    def write(self, path):
+        spots = {}
+        for (spot, month), hist in self.hist.items():
+            spots.setdefault(spot, {})[str(month)] = hist.to_sparse()
+        data = {"version": 1, "spots": spots, "last_hour": dict(self.last_hour)}
+        # écriture atomique : fichier temporaire puis renommage
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+
+
+class Climatology:
+    """
+    Histogrammes par (spot, mois), persistés dans un fichier JSON.
+
+    record() ne compte qu'une fois chaque heure de prévision d'un spot,
+    même si /score est appelé plusieurs fois pour la même heure.
+    Au-delà de max_spots spots, un nouveau spot n'est ajouté qu'à la place d'un
+    spot inactif depuis STALE_DAYS jours.
+
+    Le fichier peut être partagé par plusieurs processus (API score et
+    surf_score.py) : save() relit le fichier sous verrou, y ajoute les notes
+    enregistrées depuis la dernière écriture, puis reprend l'état fusionné.
+    """
+
+    def __init__(self, path, save_interval_s=60.0, max_spots=MAX_SPOTS):
+        self.path = path
+        self.save_interval_s = save_interval_s
+        self.max_spots = max_spots
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # une seule écriture de fichier à la fois
+        self._history = _History(max_spots)
+        self._pending = []       # (spot, heure, note) notées depuis la dernière écriture
+        self._file_mtime = None  # date du fichier lors de la dernière lecture/écriture
+        self._autosave_started = False
+        self.load()
+
+    # ---------- API ----------
+    def record(self, spot, hour_iso, score):
+        """Ajoute la note de l'heure hour_iso ('YYYY-MM-DDTHH:MM') si elle est nouvelle."""
+        if score is None or not hour_iso:
+            return False
+        with self._lock:
+            if not self._history.add(spot, hour_iso, score):
+                return False
+            self._pending.append((spot, hour_iso, score))
+        return True
+
+    def percentile(self, spot, month, score):
+        """(percentile, nombre d'heures d'historique) ; percentile None si pas d'historique."""
+        hist = self._history.hist.get((spot, month))
+        if hist is None:
+            return None, 0
+        return hist.percentile(score), hist.total
+
+    def describe(self, spot, month, score):
+        """Texte du type 'top 10 % pour ce spot en octobre (312 h d'historique)'."""
+        if score is None:
+            return "percentile N/A"
+        p, n = self.percentile(spot, month, score)
+        mois = MONTHS_FR[month - 1]
+        if p is None or n < MIN_HISTORY:
+            return f"historique insuffisant pour ce spot en {mois} ({n} h)"
+        if p >= 50:
+            rank = f"top {max(1, round(100 - p))} %"
+        else:
+            rank = f"parmi les {max(1, round(p))} % les plus basses"
+        return f"{rank} pour ce spot en {mois} (percentile {round(p)}, {n} h d'historique)"
+
+    # ---------- Persistance ----------
+    def _mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _adopt(self, history, mtime):
+        """Remplace l'état en mémoire par history, plus les notes arrivées entre-temps."""
+        with self._lock:
+            for entry in self._pending:
+                history.add(*entry)
+            self._history = history
+            self._file_mtime = mtime
+
+    def load(self):
+        """(Re)lit le fichier ; les notes pas encore écrites sont conservées."""
+        mtime = self._mtime()
+        self._adopt(_History.read(self.path, self.max_spots), mtime)
+
+    def start_autosave(self):
+        """Écrit le fichier toutes les save_interval_s secondes dans un thread à part (si modifié)."""
+        with self._lock:
+            if self._autosave_started:
+                return
+            self._autosave_started = True
+        threading.Thread(target=self._autosave, daemon=True, name="climatology-autosave").start()
+
+    def _autosave(self):
+        while True:
+            time.sleep(self.save_interval_s)
+            try:
+                self.save()
+            except OSError:
+                pass  # disque plein, droits... : les notes restent en attente, on réessaiera
+
+    def save(self):
+        """Fusionne les nouvelles notes avec le fichier (qu'un autre processus a pu modifier) et l'écrit."""
+        with self._save_lock, _file_lock(self.path):
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                # rien à écrire : relecture seulement si un autre processus a écrit
+                if self._mtime() != self._file_mtime:
+                    self.load()
+                return
+            try:
+                merged = _History.read(self.path, self.max_spots)
+                for entry in pending:
+                    merged.add(*entry)   # une heure déjà écrite par l'autre processus est ignorée
+                merged.write(self.path)
+            except Exception:
+                with self._lock:
+                    self._pending[:0] = pending
+                raise
+            self._adopt(merged, self._mtime())
+
+
+@contextmanager
+def _file_lock(path):
+    """Verrou exclusif entre processus autour de la lecture-fusion-écriture du fichier."""
+    if fcntl is None:
+        yield
+        return
+    with open(path + ".lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def month_of(hour_iso):
+    return int(hour_iso[5:7])
+
+
+def utc_hour(local_hour_iso, utc_offset_s):
+    """Heure locale Open-Meteo ('YYYY-MM-DDTHH:MM') -> même instant en UTC, même format.
+
+    L'historique est tenu en UTC : deux appels avec des fuseaux différents
+    (timezone=UTC, Europe/Paris...) comptent les mêmes heures, une seule fois.
+    """
+    t = datetime.fromisoformat(local_hour_iso) - timedelta(seconds=utc_offset_s or 0)
+    return t.isoformat(timespec="minutes")
+
+
+def spot_key(lat, lon, *profile):
+    """Identifiant d'un spot : case de la grille (~1 km) + profil de notation (orientation, plages, poids...)."""
+    key = f"{round(lat, GRID_DECIMALS)},{round(lon, GRID_DECIMALS)}"
+    if profile:
+        # 300 (surf_score.py) et 300.0 (Query float de /score) doivent donner la même clé
+        profile = tuple(float(x) if isinstance(x, (int, float)) else x for x in profile)
+        key += "|" + hashlib.sha1(repr(profile).encode("utf-8")).hexdigest()[:8]
+    return key
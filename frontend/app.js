@@ -9,6 +9,9 @@ const API_URL = 'http://localhost:5000/api';
 // Variable pour stocker le spot actuellement sélectionné
 let spotActuel = null;
 
+// Connexion au flux temps réel (Server-Sent Events) du spot sélectionné
+let fluxSpot = null;
+
 /**
  * Initialisation au chargement de la page
  */
@@ -93,11 +96,44 @@ async function chargerConditionsSpot(idSpot) {
             afficherPrevisions(dataPrevisions.donnees);
         }
 
+        // Ensuite, les mises à jour arrivent toutes seules (pas de rechargement périodique)
+        spotActuel = idSpot;
+        ecouterMisesAJour(idSpot);
+
     } catch (erreur) {
         console.error('Erreur chargement conditions:', erreur);
     }
 }
 
+/**
+ * Ouvre le flux temps réel du spot: le serveur pousse un événement
+ * "mise_a_jour" uniquement quand une nouvelle prévision arrive
+ * @param {number} idSpot - ID du spot
+ */
+function ecouterMisesAJour(idSpot) {
+    // Une seule connexion à la fois: on ferme celle du spot précédent
+    if (fluxSpot) {
+        fluxSpot.close();
+    }
+
+    fluxSpot = new EventSource(`${API_URL}/flux?spots=${idSpot}`);
+
+    fluxSpot.addEventListener('mise_a_jour', function(evenement) {
+        const data = JSON.parse(evenement.data);
+        if (data.id_spot !== spotActuel) {
+            return;
+        }
+        console.log(`Mise à jour reçue pour le spot ${data.id_spot}`);
+        afficherConditions(data.conditions);
+        afficherPrevisions(data.previsions);
+    });
+
+    // EventSource se reconnecte automatiquement en cas de coupure
+    fluxSpot.onerror = function() {
+        console.warn('Flux temps réel interrompu, reconnexion...');
+    };
+}
+
 /**
  * Affiche les conditions actuelles dans la page
  * @param {Object} conditions - Données des conditions
@@ -0,0 +1,224 @@
+# profiling.py
+"""
+Profilage à la demande des requêtes de l'API score (api_scoreplage.py).
+
+Tout est désactivé par défaut ; dans ce cas chaque requête ne coûte qu'un test
+de booléen et chaque étape un accès à une ContextVar (objet "nul" partagé).
+
+Quand c'est activé (via /admin/profiling) :
+  - sample_rate : fraction des requêtes (des routes choisies) profilées avec cProfile
+                  (à partir de Python 3.12, cProfile voit tout le processus : le
+                  profil inclut les autres requêtes servies pendant la même fenêtre,
+                  indiqué par profile_scope="process" dans la capture)
+  - slow_ms     : toute requête plus lente est capturée automatiquement avec ses
+                  temps par étape (fetch / decode / score / render...) et un résumé
+                  de sa pile d'appels, prise pendant qu'elle tourne encore
+  - les captures vont dans un buffer circulaire borné (les plus anciennes sont perdues)
+"""
+import cProfile, io, pstats, random, sys, threading, time, traceback
+from collections import deque
+from contextlib import nullcontext
+from contextvars import ContextVar
+from datetime import datetime
+
+# ---------- Configuration (modifiée par l'endpoint admin) ----------
+CONFIG = {
+    "sample_rate": 0.0,   # 0.0 à 1.0
+    "routes": [],         # vide = toutes les routes
+    "slow_ms": None,      # None = pas de capture des requêtes lentes
+}
+BUFFER_SIZE = 100
+PROFILE_TOP_N = 15
+STACK_DEPTH = 12
+
+_captures = deque(maxlen=BUFFER_SIZE)
+_captures_lock = threading.Lock()
+
+# Requêtes en cours (seulement si slow_ms est actif) : id du thread -> RequestProfile
+_active = {}
+_active_lock = threading.Lock()
+_watchdog_started = False
+
+# Un seul cProfile actif à la fois dans le processus (Python 3.12+ refuse un second
+# profileur pendant qu'un autre tourne) : une requête qui ne l'obtient pas n'est
+# pas profilée avec cProfile
+_cprofile_lock = threading.Lock()
+# Avant 3.12, cProfile ne suit que le thread qui l'active ; depuis 3.12 (sys.monitoring),
+# il compte les appels de tous les threads : pas de moyen de filtrer par thread dans pstats
+PROFILE_SCOPE = "process" if sys.version_info >= (3, 12) else "thread"
+
+_NULL_STAGE = nullcontext()
+
+
+class _NullProfile:
+    """Utilisé quand le profilage est éteint : ne mesure rien."""
+    def stage(self, name):
+        return _NULL_STAGE
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        return False
+
+NULL_PROFILE = _NullProfile()
+_current = ContextVar("current_profile", default=NULL_PROFILE)
+
+
+def stage(name):
+    """À utiliser autour de chaque étape : `with stage("fetch"): ...`"""
+    return _current.get().stage(name)
+
+
+class _Stage:
+    __slots__ = ("profile", "name", "start")
+    def __init__(self, profile, name):
+        self.profile, self.name = profile, name
+    def __enter__(self):
+        self.start = time.perf_counter()
+    def __exit__(self, *exc):
+        elapsed = (time.perf_counter() - self.start) * 1000
+        stages = self.profile.stages
+        stages[self.name] = round(stages.get(self.name, 0.0) + elapsed, 3)
+        return False
+
+
+class RequestProfile:
+    """Mesure d'une requête : temps par étape, cProfile optionnel, pile si lente."""
+    def __init__(self, route, params, reason, use_cprofile, slow_ms):
+        self.route, self.params, self.reason = route, params, reason
+        self.slow_ms = slow_ms
+        self.stages = {}
+        self.stack = None
+        self.use_cprofile = use_cprofile
+        self.profiler = None
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def __enter__(self):
+        # cProfile en premier : s'il échoue (autre profileur actif, débogueur...),
+        # rien n'est encore enregistré et la requête continue sans lui
+        if self.use_cprofile and _cprofile_lock.acquire(blocking=False):
+            try:
+                profiler = cProfile.Profile()
+                profiler.enable()
+                self.profiler = profiler
+            except Exception:
+                _cprofile_lock.release()
+        self.token = _current.set(self)
+        self.thread_id = threading.get_ident()
+        self.start = time.perf_counter()
+        if self.slow_ms is not None:
+            with _active_lock:
+                _active[self.thread_id] = self
+        return self
+
+    def __exit__(self, *exc):
+        if self.profiler:
+            self.profiler.disable()
+            _cprofile_lock.release()
+        duration_ms = (time.perf_counter() - self.start) * 1000
+        if self.slow_ms is not None:
+            with _active_lock:
+                _active.pop(self.thread_id, None)
+        _current.reset(self.token)
+
+        slow = self.slow_ms is not None and duration_ms >= self.slow_ms
+        if not (slow or self.profiler or self.reason == "header"):
+            return False
+        capture = {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "route": self.route,
+            "params": self.params,
+            "reason": self.reason,
+            "cprofile_busy": self.use_cprofile and self.profiler is None,
+            "slow": slow,
+            "duration_ms": round(duration_ms, 3),
+            "stages_ms": self.stages,
+            "stack": self.stack,
+            "profile": _profile_summary(self.profiler) if self.profiler else None,
+            "profile_scope": PROFILE_SCOPE if self.profiler else None,
+        }
+        with _captures_lock:
+            _captures.append(capture)
+        return False
+
+
+def _profile_summary(profiler):
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats("cumulative").print_stats(PROFILE_TOP_N)
+    return [line for line in out.getvalue().splitlines() if line.strip()]
+
+
+def start(route, params=None, header=None, admin_ok=None):
+    """
+    Profil à utiliser pour une requête (NULL_PROFILE si rien n'est activé).
+    header   : valeur de l'en-tête X-Profile ; "1" force cProfile (admin uniquement).
+    params   : fonction qui retourne les paramètres à garder dans la capture
+    admin_ok : fonction qui dit si la requête vient d'un admin
+    params et admin_ok ne sont appelées que si la requête est réellement profilée
+    (resp. si X-Profile: 1 est présent) : profilage éteint = aucun travail en plus.
+    """
+    slow_ms = CONFIG["slow_ms"]
+    forced = header == "1" and admin_ok is not None and admin_ok()
+    sampled = (
+        CONFIG["sample_rate"] > 0.0
+        and (not CONFIG["routes"] or route in CONFIG["routes"])
+        and random.random() < CONFIG["sample_rate"]
+    )
+    if slow_ms is None and not forced and not sampled:
+        return NULL_PROFILE
+    reason = "header" if forced else "sampled" if sampled else "slow"
+    return RequestProfile(route, params() if params else "", reason, forced or sampled, slow_ms)
+
+
+# ---------- Capture de la pile des requêtes lentes ----------
+def _summarize_stack(frame):
+    frames = traceback.extract_stack(frame)[-STACK_DEPTH:]
+    return [f"{f.filename.rsplit('/', 1)[-1]}:{f.lineno} {f.name}" for f in frames]
+
+
+def _watchdog():
+    """Regarde les requêtes en cours ; une requête qui dépasse slow_ms voit sa pile capturée."""
+    while True:
+        slow_ms = CONFIG["slow_ms"]
+        if slow_ms is None:
+            time.sleep(1.0)
+            continue
+        time.sleep(min(slow_ms / 2000, 0.5))
+        now = time.perf_counter()
+        with _active_lock:
+            late = [p for p in _active.values()
+                    if p.stack is None and (now - p.start) * 1000 >= slow_ms]
+        if late:
+            frames = sys._current_frames()
+            for p in late:
+                frame = frames.get(p.thread_id)
+                if frame is not None:
+                    p.stack = _summarize_stack(frame)
+
+
+def configure(sample_rate=None, routes=None, slow_ms=None, disable_slow=False):
+    global _watchdog_started
+    if sample_rate is not None:
+        CONFIG["sample_rate"] = max(0.0, min(1.0, sample_rate))
+    if routes is not None:
+        CONFIG["routes"] = list(routes)
+    if disable_slow:
+        CONFIG["slow_ms"] = None
+    elif slow_ms is not None:
+        CONFIG["slow_ms"] = slow_ms
+    if CONFIG["slow_ms"] is not None and not _watchdog_started:
+        threading.Thread(target=_watchdog, daemon=True, name="slow-request-watchdog").start()
+        _watchdog_started = True
+    return dict(CONFIG)
+
+
+def captures():
+    with _captures_lock:
+        return list(_captures)
+
+
+def clear_captures():
+    with _captures_lock:
+        _captures.clear()
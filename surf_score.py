@@ -3,8 +3,11 @@
 
 import json
 import math
+import os
 import urllib.request
 
+from climatology import Climatology, month_of, spot_key, utc_hour
+
 # ------------------ Config Biarritz (ajuste si besoin) ------------------
 LAT = 43.483
 LON = -1.558
@@ -81,8 +84,8 @@ def tide_band_from_height(h):
     # Hors bornes: approx
     return "high" if h > TIDE_HIGH_MAX_M else "mid"
 
-# ------------------ Fetch Open-Meteo Marine (1re heure) ------------------
-def fetch_openmeteo_first_hour(lat, lon):
+# ------------------ Fetch Open-Meteo Marine (toutes les heures) ------------------
+def fetch_openmeteo_hours(lat, lon):
     url = (
         "https://marine-api.open-meteo.com/v1/marine"
         f"?latitude={lat}&longitude={lon}"
@@ -93,10 +96,12 @@ def fetch_openmeteo_first_hour(lat, lon):
     with urllib.request.urlopen(url) as resp:
         data = json.loads(resp.read().decode("utf-8"))
 
-    i = 0
+    # Une entrée par heure, dans l'ordre : la 1re correspond aux conditions actuelles
     h = data["hourly"]
-    return {
+    offset = data.get("utc_offset_seconds", 0)
+    return [{
         "time": h["time"][i],
+        "time_utc": utc_hour(h["time"][i], offset),   # clé de l'historique (indépendante du fuseau)
         "wave_height_m": h["wave_height"][i],
         "wave_period_s": h["wave_period"][i],
         "wave_direction_deg": h["wave_direction"][i],
@@ -105,7 +110,7 @@ def fetch_openmeteo_first_hour(lat, lon):
         "current_velocity_ms": h["ocean_current_velocity"][i],
         "current_direction_deg": h["ocean_current_direction"][i],
         "request_url": url,
-    }
+    } for i in range(len(h["time"]))]
 
 # ------------------ Calcul note ------------------
 def compute_weighted_score(first):
@@ -134,12 +139,29 @@ def compute_weighted_score(first):
     score01 = sum(parts) / used if used else 0.0
     return round(score01 * 100), {"range": range_score, "orientation": orient_score, "tide": tide_score}
 
+# Historique des notes (même fichier que l'API score)
+CLIMATOLOGY_PATH = os.environ.get("SURF_CLIMATOLOGY_PATH", "climatology.json")
+
 # ------------------ Sortie demandée ------------------
 def main():
-    first = fetch_openmeteo_first_hour(LAT, LON)
+    hours = fetch_openmeteo_hours(LAT, LON)
+    first = hours[0]
 
     note, subs = compute_weighted_score(first)
 
+    # Percentile de la note dans l'historique du spot pour ce mois,
+    # puis ajout de chaque heure de la prévision (une heure déjà vue n'est pas recomptée)
+    climatology = Climatology(CLIMATOLOGY_PATH)
+    spot = spot_key(LAT, LON, SPOT_ORIENTATION_DEG, TIDE_PREFERENCE,
+                    IDEAL_SWELL_HEIGHT_M[0], IDEAL_SWELL_HEIGHT_M[1],
+                    IDEAL_SWELL_PERIOD_S[0], IDEAL_SWELL_PERIOD_S[1],
+                    WEIGHTS["range"], WEIGHTS["orientation"], WEIGHTS["tide"],
+                    TIDE_LOW_MAX_M, TIDE_HIGH_MIN_M, TIDE_HIGH_MAX_M, TIDE_FULL_SPAN_M)
+    percentile_txt = climatology.describe(spot, month_of(first["time_utc"]), note)
+    for hour in hours:
+        climatology.record(spot, hour["time_utc"], compute_weighted_score(hour)[0])
+    climatology.save()
+
     # 1) Conditions idéales
     print("=== Conditions idéales (profil spot) ===")
     print(f"• Plage (houle) idéale : hauteur {IDEAL_SWELL_HEIGHT_M[0]}–{IDEAL_SWELL_HEIGHT_M[1]} m, "
@@ -167,7 +189,7 @@ def main():
         print("Impossible de calculer la note (données insuffisantes).")
     else:
         print(f"NOTE = {note}/100  (poids: plage={WEIGHTS['range']}, orientation={WEIGHTS['orientation']}, marée={WEIGHTS['tide']})")
+        print(f"Percentile : {percentile_txt}")
 
 if __name__ == "__main__":
     main()
-12²A    ZED
\ No newline at end of file